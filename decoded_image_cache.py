@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Decoded images are kept as uint8 .npy files (plus a .mask.npy for the alpha channel and a
+# .json with the embedded prompt/workflow and the original size), named by a hash of
+# (path, size, mtime, decode options). A warm load is then an mmap and a dtype conversion.
+# ComfyUI empties its temp directory on startup; point OVUM_IMAGE_CACHE_DIR somewhere else to
+# keep the cache across restarts.
+DEFAULT_LIMIT_MB = 2048
+_FORMAT_VERSION = 1
+
+CachedImage = Tuple[np.ndarray, Optional[np.ndarray], Dict[str, Any]]
+
+
+def _default_directory() -> str:
+    directory = os.environ.get('OVUM_IMAGE_CACHE_DIR', '').strip()
+    if directory:
+        return directory
+    try:
+        # noinspection PyUnresolvedReferences
+        import folder_paths
+        temp = folder_paths.get_temp_directory()
+    except Exception:
+        import tempfile
+        temp = tempfile.gettempdir()
+    return os.path.join(temp, 'ovum-decoded-images')
+
+
+def _default_limit_bytes() -> int:
+    try:
+        return int(float(os.environ.get('OVUM_IMAGE_CACHE_MB', DEFAULT_LIMIT_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_LIMIT_MB * 1024 * 1024
+
+
+class DecodedImageCache:
+    """
+    On-disk cache of decoded images with a size cap and least-recently-used eviction.
+
+    The index of entries and their sizes is rebuilt from the directory on first use (oldest
+    modification time first); hits touch the entry's files so the order survives restarts.
+    """
+
+    def __init__(self, directory: Optional[str] = None, limit_bytes: Optional[int] = None):
+        self._directory = directory
+        self.limit_bytes = _default_limit_bytes() if limit_bytes is None else limit_bytes
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = _default_directory()
+        return self._directory
+
+    @staticmethod
+    def key(path: str, st: os.stat_result, options: Tuple[Any, ...] = ()) -> str:
+        raw = '\0'.join(map(str, (_FORMAT_VERSION, os.path.abspath(path), st.st_size, st.st_mtime_ns) + tuple(options)))
+        return hashlib.blake2b(raw.encode('utf-8', 'surrogateescape'), digest_size=16).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return base + '.npy', base + '.mask.npy', base + '.json'
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Called with the lock held."""
+        if self._entries is None:
+            found: Dict[str, list] = {}
+            if os.path.isdir(self.directory):
+                for sub in os.scandir(self.directory):
+                    if not sub.is_dir():
+                        continue
+                    for entry in os.scandir(sub.path):
+                        key = entry.name.split('.', 1)[0]
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        info = found.setdefault(key, [0, 0.0, False])
+                        info[0] += st.st_size
+                        info[1] = max(info[1], st.st_mtime)
+                        if entry.name.endswith('.json'):
+                            info[2] = True
+            self._entries = OrderedDict()
+            self._total = 0
+            for key, (size, _, complete) in sorted(found.items(), key=lambda kv: kv[1][1]):
+                if complete:
+                    self._entries[key] = size
+                    self._total += size
+        return self._entries
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        """Return (rgb, alpha or None, info) with the arrays memory-mapped, or None on a miss."""
+        image_path, mask_path, info_path = self._paths(key)
+        with self._lock:
+            entries = self._load_index()
+            if key not in entries:
+                self.misses += 1
+                return None
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            rgb = np.load(image_path, mmap_mode='r')
+            alpha = np.load(mask_path, mmap_mode='r') if info.get('has_mask') else None
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+                self._discard(key)
+            return None
+        for p in (image_path, mask_path, info_path):
+            try:
+                os.utime(p)
+            except OSError:
+                pass
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += rgb.nbytes + (alpha.nbytes if alpha is not None else 0)
+        return rgb, alpha, info
+
+    def put(self, key: str, rgb: np.ndarray, alpha: Optional[np.ndarray], info: Dict[str, Any]) -> None:
+        """Store an entry; the .json is written last, so an entry without one is incomplete and ignored."""
+        image_path, mask_path, info_path = self._paths(key)
+        try:
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)
+            info = dict(info, has_mask=alpha is not None)
+            payload = json.dumps(info)
+            for path, array in ((image_path, rgb), (mask_path, alpha)):
+                if array is None:
+                    continue
+                tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(array, dtype=np.uint8))
+                os.replace(tmp, path)
+            tmp = f'{info_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp, info_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"[ovum] could not write decoded image cache entry {image_path}: {e}")
+            return
+        size = sum(os.path.getsize(p) for p in (image_path, mask_path, info_path) if os.path.exists(p))
+        with self._lock:
+            entries = self._load_index()
+            self._total += size - entries.pop(key, 0)
+            entries[key] = size
+            while self._total > self.limit_bytes and len(entries) > 1:
+                oldest = next(iter(entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        """Remove an entry's files and forget it. Called with the lock held."""
+        if self._entries is not None:
+            self._total -= self._entries.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_index()):
+                self._discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries) if self._entries is not None else None,
+                "bytes": self._total,
+                "limit_bytes": self.limit_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+            }
+
+
+DECODED_IMAGE_CACHE = DecodedImageCache()
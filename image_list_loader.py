@@ -1,6 +1,14 @@
+import errno
 import os
 import re
 import json
+import math
+import mmap
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from typing import List, Tuple, Dict, Any, Optional
 from pathlib import Path
 import logging
@@ -12,13 +20,20 @@ from PIL import Image, ImageOps
 
 # noinspection PyUnresolvedReferences,PyPackageRequirements
 from server import PromptServer
+# noinspection PyUnresolvedReferences
+import comfy.model_management
+# noinspection PyUnresolvedReferences
+import comfy.utils
 
+from decoded_image_cache import DECODED_IMAGE_CACHE, DecodedImageCache
 from metadata.metadata_file_extractor import MetadataFileExtractor
 from prompt_server_routes import folder_paths, OUTPUT_ROOT, INPUT_ROOT
 from folder_paths_node import normalize_path
 
 logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif'}
+
 
 class CustomFilterBase:
     def accept(self, filename: str, full_path: str) -> bool:  # pragma: no cover - interface
@@ -45,26 +60,27 @@ sort_methods = [
     "Modification Time (DESC)"
 ]
 
-def sort_by(items, base_path='.', method=None):
+def sort_by(items, base_path='.', method=None, stats=None):
+    """Sort `items` by `method`; `stats` optionally maps each item to an os.stat_result (or None)."""
     def fullpath(x): return os.path.join(base_path, x)
 
-    def get_atime(path):
+    def stat_time(path, attr, getter):
+        if stats is not None:
+            st = stats.get(path)
+            return getattr(st, attr) if st is not None else float('-inf')
         try:
-            return os.path.getatime(path)
+            return getter(fullpath(path))
         except FileNotFoundError:
             return float('-inf')
 
+    def get_atime(path):
+        return stat_time(path, 'st_atime', os.path.getatime)
+
     def get_ctime(path):
-        try:
-            return os.path.getctime(path)
-        except FileNotFoundError:
-            return float('-inf')
+        return stat_time(path, 'st_ctime', os.path.getctime)
 
     def get_mtime(path):
-        try:
-            return os.path.getmtime(path)
-        except FileNotFoundError:
-            return float('-inf')
+        return stat_time(path, 'st_mtime', os.path.getmtime)
 
     if method == "Alphabetical (ASC)":
         return sorted(items)
@@ -75,22 +91,463 @@ def sort_by(items, base_path='.', method=None):
     elif method == "Numerical (DESC)":
         return sorted(items, key=lambda x: extract_first_number(os.path.splitext(x)[0]), reverse=True)
     elif method == "Access Time (ASC)":
-        return sorted(items, key=lambda x: get_atime(fullpath(x)))
+        return sorted(items, key=get_atime)
     elif method == "Access Time (DESC)":
-        return sorted(items, key=lambda x: get_atime(fullpath(x)), reverse=True)
+        return sorted(items, key=get_atime, reverse=True)
     elif method == "Creation Time (ASC)":
-        return sorted(items, key=lambda x: get_ctime(fullpath(x)))
+        return sorted(items, key=get_ctime)
     elif method == "Creation Time (DESC)":
-        return sorted(items, key=lambda x: get_ctime(fullpath(x)), reverse=True)
+        return sorted(items, key=get_ctime, reverse=True)
     elif method == "Modification Time (ASC)":
-        return sorted(items, key=lambda x: get_mtime(fullpath(x)))
+        return sorted(items, key=get_mtime)
     elif method == "Modification Time (DESC)":
-        return sorted(items, key=lambda x: get_mtime(fullpath(x)), reverse=True)
+        return sorted(items, key=get_mtime, reverse=True)
     elif method == "None (Reversed)":
-        return reversed(items)
+        return list(reversed(items))
     else:
         return items
 
+class DirectoryListing:
+    """A filtered, sorted directory scan: the files, their stat results and the mtime of every directory read."""
+    __slots__ = ('files', 'stats', 'dir_mtimes', 'scan_seconds')
+
+    def __init__(self, files: List[Path], stats: Dict[Path, Optional[os.stat_result]], dir_mtimes: Dict[str, int], scan_seconds: float):
+        self.files = files
+        self.stats = stats
+        self.dir_mtimes = dir_mtimes
+        self.scan_seconds = scan_seconds
+
+    def is_current(self) -> bool:
+        """True while no directory that was read has been modified (files added, removed or renamed)."""
+        try:
+            return all(os.stat(d).st_mtime_ns == mtime for d, mtime in self.dir_mtimes.items())
+        except OSError:
+            return False
+
+
+class DirectoryListingCache:
+    """
+    Directory listings keyed by (directory, filters, recursion, sort method), so paging
+    through a large folder rescans and resorts it only when a directory changes.
+    """
+
+    def __init__(self, limit: int = 32):
+        self._listings: "OrderedDict[tuple, DirectoryListing]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self.last_scan_seconds: Optional[float] = None
+
+    def get(self, key: tuple) -> Optional[DirectoryListing]:
+        with self._lock:
+            listing = self._listings.get(key)
+        if listing is not None and listing.is_current():
+            with self._lock:
+                self._listings.move_to_end(key)
+                self.hits += 1
+            return listing
+        return None
+
+    def put(self, key: tuple, listing: DirectoryListing) -> None:
+        with self._lock:
+            self.misses += 1
+            self.last_scan_seconds = listing.scan_seconds
+            self._listings[key] = listing
+            self._listings.move_to_end(key)
+            while len(self._listings) > self.limit:
+                self._listings.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._listings.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "listings": len(self._listings),
+                "files": sum(len(v.files) for v in self._listings.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "last_scan_seconds": self.last_scan_seconds,
+            }
+
+
+DIRECTORY_LISTINGS = DirectoryListingCache()
+
+class ImageSizeFilter:
+    """Width/height/aspect (width / height) limits checked against an image header; 0 means no limit."""
+    __slots__ = ('min_width', 'max_width', 'min_height', 'max_height', 'min_aspect', 'max_aspect')
+
+    def __init__(self, min_width: int = 0, max_width: int = 0, min_height: int = 0, max_height: int = 0,
+                 min_aspect: float = 0.0, max_aspect: float = 0.0):
+        self.min_width = min_width
+        self.max_width = max_width
+        self.min_height = min_height
+        self.max_height = max_height
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+
+    @property
+    def active(self) -> bool:
+        return any((self.min_width, self.max_width, self.min_height, self.max_height, self.min_aspect, self.max_aspect))
+
+    def accepts(self, width: int, height: int) -> bool:
+        if self.min_width and width < self.min_width:
+            return False
+        if self.max_width and width > self.max_width:
+            return False
+        if self.min_height and height < self.min_height:
+            return False
+        if self.max_height and height > self.max_height:
+            return False
+        if self.min_aspect or self.max_aspect:
+            aspect = width / height if height else float('inf')
+            if self.min_aspect and aspect < self.min_aspect:
+                return False
+            if self.max_aspect and aspect > self.max_aspect:
+                return False
+        return True
+
+    def accepts_image(self, i: Image.Image) -> bool:
+        """Check an opened, not yet decoded image, using its size as it will be after EXIF orientation."""
+        return self.accepts(*oriented_size(i))
+
+
+# Formats whose EXIF is parsed along with the header; a PNG's getexif() loads the whole image
+# to look for an eXIf chunk after the image data, unless one came before it
+_HEADER_EXIF_FORMATS = ('JPEG', 'MPO', 'TIFF', 'WEBP')
+
+
+def oriented_size(i: Image.Image) -> Tuple[int, int]:
+    """
+    (width, height) from the header, swapped when the EXIF orientation rotates by 90 degrees.
+    Orientation is only read where it is available without decoding the image.
+    """
+    width, height = i.size
+    if i.format not in _HEADER_EXIF_FORMATS and 'exif' not in i.info:
+        return width, height
+    try:
+        if i.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+    except Exception:
+        pass
+    return width, height
+
+
+def draft_for_max_side(i: Image.Image, max_side: int) -> None:
+    """
+    Before loading, ask the decoder for the smallest power-of-two scale that keeps the longest side
+    at least `max_side` (JPEG DCT scaling, 1/2 to 1/8). A no-op for formats without draft support.
+    """
+    width, height = i.size
+    longest = max(width, height)
+    if longest <= max_side:
+        return
+    scale = max_side / longest
+    i.draft('RGB', (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))))
+
+
+def downscale_to_max_side(i: Image.Image, max_side: int) -> Image.Image:
+    """Shrink so the longest side is `max_side`: a cheap integer `reduce` to within 2x, then a Lanczos resize."""
+    width, height = i.size
+    longest = max(width, height)
+    if longest <= max_side:
+        return i
+    i = i.convert('RGBA' if 'A' in i.getbands() else 'RGB')
+    factor = 1
+    while longest // (factor * 2) >= max_side:
+        factor *= 2
+    if factor > 1:
+        i = i.reduce(factor)
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if i.size != size:
+        i = i.resize(size, Image.Resampling.LANCZOS)
+    return i
+
+
+def uint8_to_image_tensor(frames: List[np.ndarray], out: Optional[np.ndarray] = None) -> torch.Tensor:
+    """
+    Convert same-shaped uint8 (H, W, 3) frames to one float32 (N, H, W, 3) tensor in [0, 1].
+    Each frame is divided straight into the output (`out`, or a new array), so there is a single
+    float32 allocation and the values match `frame.astype(np.float32) / 255.0` exactly.
+    """
+    if out is None:
+        out = np.empty((len(frames),) + frames[0].shape, dtype=np.float32)
+    for k, frame in enumerate(frames):
+        np.divide(frame, np.float32(255.0), out=out[k], dtype=np.float32)
+    return torch.from_numpy(out)
+
+
+def uint8_to_mask_tensor(alpha: Optional[np.ndarray]) -> torch.Tensor:
+    """Convert a uint8 (H, W) alpha channel to a ComfyUI MASK (1 - alpha), or the usual 64x64 zeros without one."""
+    if alpha is None:
+        return torch.zeros((64, 64), dtype=torch.float32, device="cpu")
+    mask = np.divide(alpha, np.float32(255.0), dtype=np.float32)
+    np.subtract(np.float32(1.0), mask, out=mask)
+    return torch.from_numpy(mask)
+
+
+def _reserve_file(f, size: int) -> None:
+    """
+    Allocate the blocks of a file that is about to be memory-mapped. A sparse file would only get
+    them when the mapping is written, and running out of disk then is a SIGBUS that kills the process;
+    here it is an OSError.
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    block = bytes(1024 * 1024)
+    f.seek(0)
+    for start in range(0, size, len(block)):
+        f.write(block[:size - start])
+    f.flush()
+
+
+class MappedFrameStore:
+    """
+    Builds image tensors on temporary files mapped into memory, so a very large list of images
+    can be paged in and out by the OS instead of staying resident.
+
+    The files are unlinked as soon as they are created (TemporaryFile); the disk space is returned
+    once the last tensor viewing a segment is released.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._segment: Optional[mmap.mmap] = None
+        self._used = 0
+        self.segments = 0
+        self.bytes = 0
+
+    def _new_segment(self, nbytes: int) -> None:
+        size = -(-max(self.segment_bytes, nbytes) // mmap.PAGESIZE) * mmap.PAGESIZE
+        with tempfile.TemporaryFile(prefix='ovum-frames-', dir=self.directory) as f:
+            _reserve_file(f, size)
+            # The mapping keeps the (already deleted) file alive after f is closed
+            self._segment = mmap.mmap(f.fileno(), size)
+        self._used = 0
+        self.segments += 1
+
+    def image_tensor(self, rgb: np.ndarray) -> torch.Tensor:
+        """Convert one uint8 (H, W, 3) frame into a (1, H, W, 3) float32 tensor viewing the mapped file."""
+        nbytes = rgb.size * 4
+        if self._segment is None or self._used + nbytes > len(self._segment):
+            self._new_segment(nbytes)
+        offset = self._used
+        self._used = -(-(offset + nbytes) // mmap.PAGESIZE) * mmap.PAGESIZE
+        self.bytes += nbytes
+        out = np.frombuffer(self._segment, dtype=np.float32, count=rgb.size, offset=offset).reshape((1,) + rgb.shape)
+        image_t = uint8_to_image_tensor([rgb], out)
+        if hasattr(mmap, 'MADV_DONTNEED'):
+            # Written pages stay in the page cache (and the file), but are no longer counted against
+            # this process until they are read again
+            try:
+                self._segment.madvise(mmap.MADV_DONTNEED, offset, self._used - offset)
+            except (OSError, ValueError):
+                pass
+        return image_t
+
+
+def _mapped_frames_directory() -> Optional[str]:
+    try:
+        directory = folder_paths.get_temp_directory()
+        os.makedirs(directory, exist_ok=True)
+        return directory
+    except Exception:
+        return None
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class PagePrefetcher:
+    """
+    Loads the page after the one just returned on a background thread, keeping at most `limit`
+    pages. Pages are keyed by their exact files and the decode options, so a changed listing or
+    different options simply miss.
+    """
+
+    def __init__(self, limit: int = 2):
+        self.limit = limit
+        self._pages: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def schedule(self, key: tuple, load) -> None:
+        with self._lock:
+            if key in self._pages:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ovum-image-prefetch')
+            self._pages[key] = self._executor.submit(load)
+            while len(self._pages) > self.limit:
+                _, oldest = self._pages.popitem(last=False)
+                oldest.cancel()
+
+    def take(self, key: tuple) -> Optional[Dict[Path, Tuple[Optional[Tuple[int, int]], Any]]]:
+        """
+        Remove and return a prefetched page, waiting for it if it is still loading. The wait is
+        interruptible; the page then finishes loading in the background and is dropped.
+        """
+        with self._lock:
+            future = self._pages.pop(key, None)
+            if future is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        while not wait([future], timeout=0.1).done:
+            comfy.model_management.throw_exception_if_processing_interrupted()
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"[ovum] image prefetch failed: {e}")
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            for future in self._pages.values():
+                future.cancel()
+            self._pages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "ready": sum(1 for f in self._pages.values() if f.done()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+PAGE_PREFETCHER = PagePrefetcher()
+
+class ImageListLoadStatus:
+    """Progress of the running (or last) load, for the /ovum/image-list status route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loads = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.running = False
+        self.directory = ""
+        self.files_scanned = 0
+        self.page_files = 0
+        self.processed = 0
+        self.decoded = 0
+        self.from_cache = 0
+        self.from_prefetch = 0
+        self.bytes_read = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.interrupted = False
+        self.error: Optional[str] = None
+
+    def begin(self, directory: str, files_scanned: int, page_files: int) -> None:
+        with self._lock:
+            self._reset()
+            self.loads += 1
+            self.running = True
+            self.directory = directory
+            self.files_scanned = files_scanned
+            self.page_files = page_files
+            self.started = time.time()
+
+    def advance(self, source: Optional[str], bytes_read: int = 0) -> None:
+        """
+        One file handled: `source` is where its image came from ('file', 'cache' or 'prefetch'),
+        or None if it was skipped, and `bytes_read` how much of the file this load read.
+        """
+        with self._lock:
+            self.processed += 1
+            if source is None:
+                return
+            self.decoded += 1
+            if source == 'cache':
+                self.from_cache += 1
+            elif source == 'prefetch':
+                self.from_prefetch += 1
+            self.bytes_read += bytes_read
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.running = False
+            self.finished = time.time()
+            if isinstance(error, comfy.model_management.InterruptProcessingException):
+                self.interrupted = True
+            elif error is not None:
+                self.error = str(error)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = ((self.finished if not self.running else None) or time.time()) - self.started if self.started else 0.0
+            result = {
+                "running": self.running,
+                "loads": self.loads,
+                "directory": self.directory,
+                "files_scanned": self.files_scanned,
+                "page_files": self.page_files,
+                "processed": self.processed,
+                "decoded": self.decoded,
+                "from_cache": self.from_cache,
+                "from_prefetch": self.from_prefetch,
+                "bytes_read": self.bytes_read,
+                "started": self.started,
+                "elapsed_seconds": elapsed,
+                "images_per_second": self.decoded / elapsed if elapsed > 0 else None,
+                "mib_per_second": self.bytes_read / 2 ** 20 / elapsed if elapsed > 0 else None,
+                "interrupted": self.interrupted,
+                "error": self.error,
+            }
+        result["listings"] = DIRECTORY_LISTINGS.stats()
+        result["decoded_cache"] = DECODED_IMAGE_CACHE.stats()
+        result["prefetch"] = PAGE_PREFETCHER.stats()
+        return result
+
+
+IMAGE_LIST_STATUS = ImageListLoadStatus()
+
+DEFAULT_DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+_decode_pools: Dict[int, ThreadPoolExecutor] = {}
+_decode_pool_lock = threading.Lock()
+
+
+def get_decode_pool(workers: int) -> ThreadPoolExecutor:
+    """
+    Shared decode pool of `workers` threads. PIL and numpy release the GIL while decoding/converting.
+    There is one pool per size asked for, never shut down, since a prefetch or another loader node may
+    still be submitting to it; idle threads cost next to nothing.
+    """
+    with _decode_pool_lock:
+        pool = _decode_pools.get(workers)
+        if pool is None:
+            pool = _decode_pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'ovum-image-decode-{workers}')
+        return pool
+
+
 class LoadImagesListWithCallback:
     NAME = "Load images list (regex/custom filter + callback)"
     CATEGORY = "ovum/image"
@@ -118,6 +575,19 @@ class LoadImagesListWithCallback:
                 "sort_method": (sort_methods,),
                 "invoke_callback": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled"}),
                 "callback_message": ("STRING", {"default": "ovum.image_list.info"}),
+                "min_width": ("INT", {"default": 0, "min": 0, "max": 0xffff, "step": 1, "tooltip": "Skip images narrower than this (0 = no limit). Checked from the file header, before decoding."}),
+                "max_width": ("INT", {"default": 0, "min": 0, "max": 0xffff, "step": 1, "tooltip": "Skip images wider than this (0 = no limit)."}),
+                "min_height": ("INT", {"default": 0, "min": 0, "max": 0xffff, "step": 1, "tooltip": "Skip images shorter than this (0 = no limit)."}),
+                "max_height": ("INT", {"default": 0, "min": 0, "max": 0xffff, "step": 1, "tooltip": "Skip images taller than this (0 = no limit)."}),
+                "min_aspect": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 0.01, "tooltip": "Skip images whose width / height is below this (0 = no limit)."}),
+                "max_aspect": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 0.01, "tooltip": "Skip images whose width / height is above this (0 = no limit)."}),
+                "max_side": ("INT", {"default": 0, "min": 0, "max": 0xffff, "step": 1, "tooltip": "Downscale so the longest side is at most this (0 = full size). JPEGs are decoded at a reduced scale directly."}),
+                "decoded_cache": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled", "tooltip": "Keep decoded images in an on-disk cache (OVUM_IMAGE_CACHE_DIR, capped at OVUM_IMAGE_CACHE_MB) so later loads skip decoding."}),
+                "uint8_pixels": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled", "tooltip": "Keep decoded pixels as uint8 until the outputs are assembled, then convert each image to float32 in a single pass."}),
+                "memory_mapped": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled", "tooltip": "Write decoded images to temporary memory-mapped files and output views onto them, so very large lists can be paged out instead of held in RAM."}),
+                "prefetch_next": ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled", "tooltip": "After returning a page, start loading the next one (start_index + image_load_cap) in the background."}),
+                "decode_workers": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1,
+                                           "tooltip": f"Images decoded in parallel. 0 = automatic ({DEFAULT_DECODE_WORKERS}), 1 = sequential."}),
             }
         }
 
@@ -157,9 +627,7 @@ class LoadImagesListWithCallback:
     def _should_include_file(self, path: Path, pattern: re.Pattern[str] | None, custom: Optional[CustomFilterBase]) -> bool:
         """Check if a file should be included based on extension, regex, and custom filter."""
         # Filter by image extensions
-        valid_ext = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif'}
-
-        if path.suffix.lower() not in valid_ext:
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
             return False
 
         name = path.name
@@ -172,22 +640,66 @@ class LoadImagesListWithCallback:
         return True
 
     def _collect_files(self, directory: str, regex: str, custom_filter_class: str, recurse: bool, load_always: bool, sort_method: str) -> List[Path]:
+        return self._list_directory(directory, regex, custom_filter_class, recurse, sort_method).files
+
+    def _list_directory(self, directory: str, regex: str, custom_filter_class: str, recurse: bool, sort_method: str) -> DirectoryListing:
         root = Path(directory)
         if not root.is_dir():
             raise FileNotFoundError(f"Directory '{directory}' cannot be found.")
 
+        key = (os.path.normcase(os.path.abspath(directory)), regex, custom_filter_class, bool(recurse), sort_method)
+        listing = DIRECTORY_LISTINGS.get(key)
+        if listing is not None:
+            logger.debug(f"[ovum] directory listing cache hit for {directory}: {len(listing.files)} files")
+            return listing
+
+        start = time.perf_counter()
         pattern, custom = self._setup_filters(regex, custom_filter_class)
         files: List[Path] = []
-        iterator = root.rglob('*') if recurse else root.iterdir()
+        stats: Dict[Path, Optional[os.stat_result]] = {}
+        dir_mtimes: Dict[str, int] = {}
+        self._scan_into(str(root), recurse, pattern, custom, files, stats, dir_mtimes)
+        files = list(sort_by(files, directory, sort_method, stats))
+        listing = DirectoryListing(files, stats, dir_mtimes, time.perf_counter() - start)
+        DIRECTORY_LISTINGS.put(key, listing)
+        logger.info(f"[ovum] scanned {directory}: {len(files)} images in {listing.scan_seconds * 1000:.1f} ms "
+                    f"({len(dir_mtimes)} directories)")
+        return listing
 
-        for p in iterator:
-            if p.is_dir():
+    def _scan_into(self, directory: str, recurse: bool, pattern, custom, files: List[Path],
+                   stats: Dict[Path, Optional[os.stat_result]], dir_mtimes: Dict[str, int]) -> None:
+        """
+        os.scandir walk in the same order as Path.iterdir / Path.rglob('*'): a directory's
+        entries, then each of its subdirectories in turn (symlinked directories are not entered).
+        """
+        try:
+            dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if recurse and not entry.is_symlink():
+                    subdirs.append(entry.path)
                 continue
-            if self._should_include_file(p, pattern, custom):
-                files.append(p)
-
-        result = sort_by(files, directory, sort_method)
-        return result
+            if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = Path(entry.path)
+            if not self._should_include_file(path, pattern, custom):
+                continue
+            try:
+                stats[path] = entry.stat()
+            except OSError:
+                stats[path] = None
+            files.append(path)
+        for subdir in subdirs:
+            self._scan_into(subdir, recurse, pattern, custom, files, stats, dir_mtimes)
 
     def _collect_from_list(self, filenames: List[Any], regex: str, custom_filter_class: str) -> List[Path]:
         # Accept an explicit list of filenames/paths as an alternative to directory scanning.
@@ -230,17 +742,132 @@ class LoadImagesListWithCallback:
 
     def _load_image_mask(self, path: Path) -> Tuple[torch.Tensor, torch.Tensor]:
         with Image.open(path) as i:
-            i = ImageOps.exif_transpose(i)
-            image = i.convert("RGB")
-            image = np.array(image).astype(np.float32) / 255.0
-            image_t = torch.from_numpy(image)[None,]
-            if 'A' in i.getbands():
-                mask = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask_t = 1. - torch.from_numpy(mask)
-            else:
-                mask_t = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
+            return self._image_to_tensors(i)
+
+    @staticmethod
+    def _image_to_tensors(i: Image.Image, max_side: int = 0) -> Tuple[torch.Tensor, torch.Tensor]:
+        return LoadImagesListWithCallback._arrays_to_tensors(*LoadImagesListWithCallback._decode_arrays(i, max_side))
+
+    @staticmethod
+    def _decode_arrays(i: Image.Image, max_side: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Decode to uint8 RGB (H, W, 3) and, for images with an alpha band, uint8 alpha (H, W)."""
+        if max_side > 0:
+            draft_for_max_side(i, max_side)
+        i = ImageOps.exif_transpose(i)
+        if max_side > 0:
+            i = downscale_to_max_side(i, max_side)
+        rgb = np.asarray(i.convert("RGB"))
+        alpha = np.asarray(i.getchannel('A')) if 'A' in i.getbands() else None
+        return rgb, alpha
+
+    @staticmethod
+    def _arrays_to_tensors(rgb: np.ndarray, alpha: Optional[np.ndarray]) -> Tuple[torch.Tensor, torch.Tensor]:
+        image = rgb.astype(np.float32) / 255.0
+        image_t = torch.from_numpy(image)[None,]
+        if alpha is not None:
+            mask = alpha.astype(np.float32) / 255.0
+            mask_t = 1. - torch.from_numpy(mask)
+        else:
+            mask_t = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
         return image_t, mask_t
 
+    def _load_file(self, filepath: Path, size_filter: Optional[ImageSizeFilter] = None, max_side: int = 0,
+                   cache: Optional[DecodedImageCache] = None, uint8_pixels: bool = False,
+                   sources: Optional[Dict[Path, str]] = None) -> Optional[Tuple[Any, Any, Dict[str, Any]]]:
+        """
+        Decode one file and read its embedded prompt/workflow, opening it only once.
+        Returns None, having read only the header, when the image fails `size_filter`.
+        With a `cache`, a previous decode with the same options is memory-mapped instead.
+        With `uint8_pixels`, the pixels are returned as the uint8 (rgb, alpha) arrays, left for the caller to convert.
+        Cache hits are recorded as 'cache' in `sources`.
+        """
+        key = None
+        if cache is not None:
+            key = cache.key(str(filepath), os.stat(filepath), (max_side,))
+            cached = cache.get(key)
+            if cached is not None:
+                rgb, alpha, info = cached
+                if sources is not None:
+                    sources[filepath] = 'cache'
+                if size_filter is not None and not size_filter.accepts(*info["size"]):
+                    return None
+                img, m = (rgb, alpha) if uint8_pixels else self._arrays_to_tensors(rgb, alpha)
+                return img, m, {"prompt": info.get("prompt"), "workflow": info.get("workflow")} if info.get("has_metadata") else {}
+
+        with open(filepath, 'rb') as fp, Image.open(fp) as i:
+            size = oriented_size(i)
+            if size_filter is not None and not size_filter.accepts(*size):
+                return None
+            rgb, alpha = self._decode_arrays(i, max_side)
+            # Decoding loaded the whole PNG, so text chunks on either side of the image data are in i.info
+            try:
+                combined_dict = MetadataFileExtractor.extract_both_from_open(str(filepath), i, fp)
+            except Exception as e:
+                logger.warning(f"Failed to extract metadata from {filepath}: {e}")
+                combined_dict = {"prompt": {}, "workflow": {}}
+        if key is not None:
+            cache.put(key, rgb, alpha, {"size": size, "has_metadata": bool(combined_dict),
+                                        "prompt": combined_dict.get("prompt"), "workflow": combined_dict.get("workflow")})
+        if uint8_pixels:
+            return rgb, alpha, combined_dict
+        img, m = self._arrays_to_tensors(rgb, alpha)
+        return img, m, combined_dict
+
+    def _load_files(self, files: List[Path], workers: int, size_filter: Optional[ImageSizeFilter] = None, max_side: int = 0,
+                    cache: Optional[DecodedImageCache] = None, uint8_pixels: bool = False, sources: Optional[Dict[Path, str]] = None):
+        """
+        Yield (filepath, result) in `files` order, where result is the `_load_file` tuple or None
+        if the file could not be loaded or was filtered out. With more than one worker, files are decoded on the shared pool.
+        """
+        if workers <= 1 or len(files) <= 1:
+            for filepath in files:
+                try:
+                    yield filepath, self._load_file(filepath, size_filter, max_side, cache, uint8_pixels, sources)
+                except Exception:
+                    yield filepath, None
+            return
+        pool = get_decode_pool(workers)
+        futures = [pool.submit(self._load_file, filepath, size_filter, max_side, cache, uint8_pixels, sources) for filepath in files]
+        try:
+            for index, filepath in enumerate(files):
+                future = futures[index]
+                # Drop the reference as we go so each result is owned by the caller alone
+                futures[index] = None
+                try:
+                    yield filepath, future.result()
+                except Exception:
+                    yield filepath, None
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+
+    def _load_page(self, files: List[Path], workers: int, size_filter: Optional[ImageSizeFilter], max_side: int,
+                   cache: Optional[DecodedImageCache], uint8_pixels: bool) -> Dict[Path, Tuple[Optional[Tuple[int, int]], Any]]:
+        """Load a whole page for the prefetcher: {filepath: ((mtime_ns, size) before loading, `_load_file` result)}."""
+        signatures = {filepath: _file_signature(filepath) for filepath in files}
+        return {filepath: (signatures[filepath], loaded)
+                for filepath, loaded in self._load_files(files, workers, size_filter, max_side, cache, uint8_pixels)}
+
+    def _load_prefetched(self, files: List[Path], page: Dict[Path, Tuple[Optional[Tuple[int, int]], Any]], workers: int,
+                         size_filter: Optional[ImageSizeFilter], max_side: int, cache: Optional[DecodedImageCache], uint8_pixels: bool,
+                         sources: Optional[Dict[Path, str]] = None):
+        """Like `_load_files`, taking results from a prefetched page (recorded as 'prefetch' in `sources`) unless the file changed since."""
+        stale = [f for f in files if f not in page or page[f][0] is None or page[f][0] != _file_signature(f)]
+        # Reloads come back in page order, so they are merged in as the loop reaches them
+        reloads = self._load_files(stale, workers, size_filter, max_side, cache, uint8_pixels, sources)
+        stale_files = set(stale)
+        try:
+            for filepath in files:
+                if filepath in stale_files:
+                    yield next(reloads)
+                else:
+                    if sources is not None:
+                        sources[filepath] = 'prefetch'
+                    yield filepath, page[filepath][1]
+        finally:
+            reloads.close()
+
     def _rel_or_abs(self, p: Path) -> str:
         try:
             rp = p.resolve().relative_to(OUTPUT_ROOT)
@@ -250,12 +877,16 @@ class LoadImagesListWithCallback:
 
     def load_images(self, prev_image_exs: Optional[List[Dict[str, Any]]] = None, directory: str = "", filenames: Optional[List[Any]] = None, regex: str = "", custom_filter_class: str = "", image_load_cap: int = 0,
                     start_index: int = 0, recurse: bool = False, invoke_callback: bool = False, load_always: bool = False, sort_method: str = "None",
-                    callback_message: str = "ovum.image_list.info"):
+                    callback_message: str = "ovum.image_list.info", decode_workers: int = 0,
+                    min_width: int = 0, max_width: int = 0, min_height: int = 0, max_height: int = 0,
+                    min_aspect: float = 0.0, max_aspect: float = 0.0, max_side: int = 0, decoded_cache: bool = False,
+                    uint8_pixels: bool = False, memory_mapped: bool = False, prefetch_next: bool = False):
         # Choose source of files: explicit filenames list (if provided) or scan directory
         if filenames is not None:
             files = self._collect_from_list(filenames, regex, custom_filter_class)
         else:
             files = self._collect_files(directory, regex, custom_filter_class, recurse, load_always, sort_method)
+        all_files = files
         total_files = len(files)
 
         # Determine exhaustion state and guard slicing to avoid IndexError when linked inputs produce large indices
@@ -331,19 +962,43 @@ class LoadImagesListWithCallback:
         except Exception:
             pass
 
-        for filepath in files:
-            try:
-                img, m = self._load_image_mask(filepath)
+        workers = decode_workers if decode_workers > 0 else DEFAULT_DECODE_WORKERS
+        mapped = MappedFrameStore(_mapped_frames_directory()) if memory_mapped else None
+        cache = DECODED_IMAGE_CACHE if decoded_cache else None
+        cache_before = cache.stats() if cache is not None else None
+        size_filter = ImageSizeFilter(min_width, max_width, min_height, max_height, min_aspect, max_aspect)
+        load_args = (workers, size_filter if size_filter.active else None, max_side, cache, uint8_pixels or memory_mapped)
+        options = (min_width, max_width, min_height, max_height, min_aspect, max_aspect, max_side, decoded_cache, uint8_pixels or memory_mapped)
+        page = PAGE_PREFETCHER.take((tuple(files), options)) if prefetch_next and files else None
+        # Images that did not come from reading their file in this call, for the status route
+        sources: Dict[Path, str] = {}
+        if page is not None:
+            logger.debug(f"[ovum] using prefetched page of {len(page)} images at index {start_index}")
+            loaded_files = self._load_prefetched(files, page, *load_args, sources=sources)
+        else:
+            loaded_files = self._load_files(files, *load_args, sources=sources)
+        IMAGE_LIST_STATUS.begin(directory if filenames is None else "", total_files, len(files))
+        pbar = comfy.utils.ProgressBar(len(files)) if files else None
+        try:
+            for filepath, loaded in loaded_files:
+                if pbar is not None:
+                    pbar.update(1)
+                source = sources.get(filepath, 'file') if loaded is not None else None
+                IMAGE_LIST_STATUS.advance(source, _file_size(filepath) if source == 'file' else 0)
+                # Checked between images; the pending decodes are cancelled when the generator is closed
+                comfy.model_management.throw_exception_if_processing_interrupted()
+                if loaded is None:
+                    continue
+                img, m, combined_dict = loaded
+                if mapped is not None:
+                    img, m = mapped.image_tensor(img), uint8_to_mask_tensor(m)
+                elif uint8_pixels:
+                    img, m = uint8_to_image_tensor([img]), uint8_to_mask_tensor(m)
                 path_str = normalize_path(str(filepath), forward_slashes=True)
                 if cb_data is not None:
                     cb_payload = json.dumps(cb_data)
                 else:
                     cb_payload = ""
-                try:
-                    combined_dict = MetadataFileExtractor.extract_both(str(filepath))
-                except Exception as e:
-                    logger.warning(f"Failed to extract metadata from {filepath}: {e}")
-                    combined_dict = {"prompt": {}, "workflow": {}}
                 # Build the IMAGE_EX dict entry and keep fields also in parallel lists for backward compat
                 image_ex = {
                     "image": img,
@@ -359,8 +1014,24 @@ class LoadImagesListWithCallback:
                 file_paths.append(path_str)
                 cb_payloads.append(cb_payload)
                 prompt_workflow_out.append(combined_dict)
-            except Exception:
-                continue
+        except BaseException as e:
+            IMAGE_LIST_STATUS.end(e)
+            raise
+        finally:
+            loaded_files.close()
+        IMAGE_LIST_STATUS.end()
+
+        if cache is not None:
+            after = cache.stats()
+            hits = after["hits"] - cache_before["hits"]
+            lookups = hits + after["misses"] - cache_before["misses"]
+            if lookups:
+                logger.info(f"[ovum] decoded image cache: {hits}/{lookups} hits ({hits / lookups:.0%}), "
+                            f"{(after['bytes_saved'] - cache_before['bytes_saved']) / 2 ** 20:.1f} MiB read instead of decoded; "
+                            f"{after['bytes'] / 2 ** 20:.1f} of {after['limit_bytes'] / 2 ** 20:.0f} MiB used")
+
+        if mapped is not None and mapped.segments:
+            logger.info(f"[ovum] {mapped.bytes / 2 ** 20:.1f} MiB of images memory-mapped in {mapped.segments} temporary file(s)")
 
         if not (len(images) == len(masks) == len(file_paths) == len(cb_payloads) == len(prompt_workflow_out)):
             logger.warning(
@@ -369,6 +1040,11 @@ class LoadImagesListWithCallback:
                 [str(f) for f in files]
             )
 
+        if prefetch_next and filenames is None and image_load_cap > 0 and not exhausted:
+            next_files = all_files[start_index + image_load_cap:start_index + 2 * image_load_cap]
+            if next_files:
+                PAGE_PREFETCHER.schedule((tuple(next_files), options), lambda: self._load_page(next_files, *load_args))
+
         return images, masks, file_paths[:], cb_payloads, prompt_workflow_out, image_ex_list, exhausted
 
 
@@ -244,8 +244,10 @@ Requirements:
         - Optionally runs search_and_replace when extra workflow info is provided
         - Optionally expands simple brace choices of the form {a|b|c}
         """
+        # one generator for the whole expansion, so concurrent calls don't share global random state
+        rng = random.Random(seed)
         # wildcard replacement via helper (may also expand some patterns)
-        expanded = find_and_replace_wildcards(input_prompt, seed, debug=True)
+        expanded = find_and_replace_wildcards(input_prompt, seed, debug=True, rng=rng)
         # optional workflow-driven replacement
         if do_search_and_replace and extra_pnginfo is not None and prompt_obj is not None:
             try:
@@ -257,7 +259,7 @@ Requirements:
         if do_brace_expansion:
             wc_re = re.compile(r'{([^}]+)}')
             def repl(m):
-                return random.choice(m.group(1).split('|'))
+                return rng.choice(m.group(1).split('|'))
             for m in wc_re.finditer(expanded):
                 expanded = expanded.replace(m.group(0), repl(m))
         return expanded
@@ -409,8 +411,7 @@ Requirements:
                      'unusual example of', 'a classic', 'an underrated', 'an innovative','a historical', 'a modern', 'a contemporary',
                      'a futuristic', 'a traditional', 'an eco-friendly', 'a controversial', 'a political', 'a religious',
                      'a spiritual', 'a philosophical', 'a scientific']
-            random.seed(seed)
-            prompt = f'{random.choice(spice)} {prompt}'
+            prompt = f'{random.Random(seed).choice(spice)} {prompt}'
         """
         example curl request to LM Studio
         curl http://localhost:1234/v1/chat/completions \
@@ -13,8 +13,60 @@ import node_helpers
 from PIL import Image, ImageOps, ImageSequence
 import numpy as np
 
-# Reuse the metadata extractor used by ovum image list node
+# Reuse the metadata extractor and pixel conversion used by ovum image list node
 from metadata.metadata_file_extractor import MetadataFileExtractor
+from image_list_loader import uint8_to_image_tensor, uint8_to_mask_tensor
+
+
+_EXCLUDED_FORMATS = ['MPO']
+
+_UINT8_PIXELS_INPUT = ("BOOLEAN", {"default": False, "label_on": "enabled", "label_off": "disabled",
+                                   "tooltip": "Keep decoded frames as uint8 and convert them to float32 once, straight into the output batch."})
+
+
+def _decode_frames(pil, uint8_pixels: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Decode every frame like LoadImage.load_image: frames that differ in size from the first are dropped."""
+    output_images = []
+    output_masks = []
+    w, h = None, None
+
+    for i in ImageSequence.Iterator(pil):
+        i = node_helpers.pillow(ImageOps.exif_transpose, i)
+        if i.mode == 'I':
+            i = i.point(lambda ii: ii * (1 / 255))
+        img = i.convert("RGB")
+        if len(output_images) == 0:
+            w, h = img.size
+        if img.size[0] != w or img.size[1] != h:
+            continue
+        if 'A' in i.getbands():
+            alpha = np.array(i.getchannel('A'))
+        elif i.mode == 'P' and 'transparency' in i.info:
+            alpha = np.array(i.convert('RGBA').getchannel('A'))
+        else:
+            alpha = None
+        if uint8_pixels:
+            # Converted below, once all frames are known
+            output_images.append(np.array(img))
+            output_masks.append(uint8_to_mask_tensor(alpha).unsqueeze(0))
+            continue
+        arr = np.array(img).astype(np.float32) / 255.0
+        tensor = torch.from_numpy(arr)[None,]
+        if alpha is not None:
+            mask_np = alpha.astype(np.float32) / 255.0
+            mask_t = 1. - torch.from_numpy(mask_np)
+        else:
+            mask_t = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
+        output_images.append(tensor)
+        output_masks.append(mask_t.unsqueeze(0))
+
+    if len(output_images) > 1 and getattr(pil, 'format', None) not in _EXCLUDED_FORMATS:
+        output_image = uint8_to_image_tensor(output_images) if uint8_pixels else torch.cat(output_images, dim=0)
+        output_mask = torch.cat(output_masks, dim=0)
+    else:
+        output_image = uint8_to_image_tensor(output_images[:1]) if uint8_pixels else output_images[0]
+        output_mask = output_masks[0]
+    return output_image, output_mask
 
 
 class LoadImageWithWorkflowOvum(LoadImage):
@@ -36,46 +88,17 @@ class LoadImageWithWorkflowOvum(LoadImage):
             "loaded_path": ("STRING", {}),
         })
         base["hidden"] = hidden
+        optional = dict(base.get("optional", {}))
+        optional["uint8_pixels"] = _UINT8_PIXELS_INPUT
+        base["optional"] = optional
         return base
 
-    def load_image_ex(self, image):
+    def load_image_ex(self, image, uint8_pixels: bool = False):
         # Largely mirrors LoadImage.load_image and augments with metadata and path
         image_path = folder_paths.get_annotated_filepath(image)
         pil = node_helpers.pillow(Image.open, image_path)
 
-        output_images = []
-        output_masks = []
-        w, h = None, None
-        excluded_formats = ['MPO']
-
-        for i in ImageSequence.Iterator(pil):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-            if i.mode == 'I':
-                i = i.point(lambda ii: ii * (1 / 255))
-            img = i.convert("RGB")
-            if len(output_images) == 0:
-                w, h = img.size
-            if img.size[0] != w or img.size[1] != h:
-                continue
-            arr = np.array(img).astype(np.float32) / 255.0
-            tensor = torch.from_numpy(arr)[None,]
-            if 'A' in i.getbands():
-                mask_np = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask_t = 1. - torch.from_numpy(mask_np)
-            elif i.mode == 'P' and 'transparency' in i.info:
-                mask_np = np.array(i.convert('RGBA').getchannel('A')).astype(np.float32) / 255.0
-                mask_t = 1. - torch.from_numpy(mask_np)
-            else:
-                mask_t = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
-            output_images.append(tensor)
-            output_masks.append(mask_t.unsqueeze(0))
-
-        if len(output_images) > 1 and getattr(pil, 'format', None) not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
-            output_mask = torch.cat(output_masks, dim=0)
-        else:
-            output_image = output_images[0]
-            output_mask = output_masks[0]
+        output_image, output_mask = _decode_frames(pil, uint8_pixels)
 
         # Metadata
         try:
@@ -118,7 +141,10 @@ class LoadImageFromOutputWithWorkflowOvum(LoadImageWithWorkflowOvum):
                         "control_after_refresh": "first",
                     },
                 }),
-            }
+            },
+            "optional": {
+                "uint8_pixels": _UINT8_PIXELS_INPUT,
+            },
         }
         # Add the same hidden loaded_path as base class
         base["hidden"] = {"loaded_path": ("STRING", {})}
@@ -145,12 +171,13 @@ class LoadImageFromOutputSubdirectoryWithWorkflowOvum(LoadImageWithWorkflowOvum)
             },
             "optional": {
                 "output_subdir": ("STRING", {"default": "", "placeholder": "e.g. my_subdir/nested"}),
+                "uint8_pixels": _UINT8_PIXELS_INPUT,
             },
         }
         base["hidden"] = {"loaded_path": ("STRING", {})}
         return base
 
-    def load_image_ex(self, image, output_subdir: str = ""):
+    def load_image_ex(self, image, output_subdir: str = "", uint8_pixels: bool = False):
         # Resolve path under a provided subdirectory of the output folder, if specified
         try:
             subdir = str(output_subdir or "").strip().strip("/\\")
@@ -167,39 +194,7 @@ class LoadImageFromOutputSubdirectoryWithWorkflowOvum(LoadImageWithWorkflowOvum)
         # The following mirrors LoadImageWithWorkflowOvum.load_image_ex but starts from image_path
         pil = node_helpers.pillow(Image.open, image_path)
 
-        output_images = []
-        output_masks = []
-        w, h = None, None
-        excluded_formats = ['MPO']
-
-        for i in ImageSequence.Iterator(pil):
-            i = node_helpers.pillow(ImageOps.exif_transpose, i)
-            if i.mode == 'I':
-                i = i.point(lambda ii: ii * (1 / 255))
-            img = i.convert("RGB")
-            if len(output_images) == 0:
-                w, h = img.size
-            if img.size[0] != w or img.size[1] != h:
-                continue
-            arr = np.array(img).astype(np.float32) / 255.0
-            tensor = torch.from_numpy(arr)[None,]
-            if 'A' in i.getbands():
-                mask_np = np.array(i.getchannel('A')).astype(np.float32) / 255.0
-                mask_t = 1. - torch.from_numpy(mask_np)
-            elif i.mode == 'P' and 'transparency' in i.info:
-                mask_np = np.array(i.convert('RGBA').getchannel('A')).astype(np.float32) / 255.0
-                mask_t = 1. - torch.from_numpy(mask_np)
-            else:
-                mask_t = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
-            output_images.append(tensor)
-            output_masks.append(mask_t.unsqueeze(0))
-
-        if len(output_images) > 1 and getattr(pil, 'format', None) not in excluded_formats:
-            output_image = torch.cat(output_images, dim=0)
-            output_mask = torch.cat(output_masks, dim=0)
-        else:
-            output_image = output_images[0]
-            output_mask = output_masks[0]
+        output_image, output_mask = _decode_frames(pil, uint8_pixels)
 
         # Metadata
         try:
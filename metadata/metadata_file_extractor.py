@@ -1,6 +1,9 @@
 import os
 import json
-from typing import Any, Dict, List, Optional, Union
+import re
+import struct
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional, Union
 from PIL import Image
 
 try:
@@ -12,6 +15,259 @@ except ImportError:
 
 from .metadata_processor import MetadataProcessor
 
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_CHUNK_HEADER = struct.Struct('>I4s')
+_PNG_CHUNK_TYPE = re.compile(rb'\w\w\w\w')
+# (bit depth, colour type) pairs Pillow can open
+_PNG_MODES = {(1, 0), (2, 0), (4, 0), (8, 0), (16, 0), (8, 2), (16, 2), (1, 3), (2, 3), (4, 3), (8, 3),
+              (8, 4), (16, 4), (8, 6), (16, 6)}
+# Pillow's PngImagePlugin limits: one decompressed text chunk, and all text in a file
+_PNG_MAX_TEXT_CHUNK = 1024 * 1024
+_PNG_MAX_TEXT_MEMORY = 64 * _PNG_MAX_TEXT_CHUNK
+
+
+def _read_exactly(f, size: int) -> Optional[bytes]:
+    """Read `size` bytes in blocks, so a corrupt chunk length cannot make us allocate gigabytes up front."""
+    if size <= _PNG_MAX_TEXT_CHUNK:
+        data = f.read(size)
+        return data if len(data) == size else None
+    blocks = []
+    while size > 0:
+        block = f.read(min(size, _PNG_MAX_TEXT_CHUNK))
+        if not block:
+            return None
+        blocks.append(block)
+        size -= len(block)
+    return b''.join(blocks)
+
+
+def _png_inflate(data: bytes) -> Optional[bytes]:
+    """Decompress a text chunk payload, None when it is corrupt; ValueError when over the size limit."""
+    inflater = zlib.decompressobj()
+    try:
+        text = inflater.decompress(data, _PNG_MAX_TEXT_CHUNK)
+    except zlib.error:
+        return None
+    if inflater.unconsumed_tail:
+        raise ValueError("PNG text chunk too large")
+    return text
+
+
+def read_png_text_chunks(filename: str) -> Optional[Dict[str, str]]:
+    """
+    Read the tEXt, zTXt and iTXt chunks that come before the image data of a PNG, without
+    Pillow and without reading past the first IDAT chunk.
+
+    Returns the same text entries Image.open(filename).info would have (later chunks win), or
+    None where Image.open would fail: not a PNG, a bad chunk CRC, truncation before the image
+    data, or an invalid header.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            if f.read(8) != _PNG_SIGNATURE:
+                return None
+            texts: Dict[str, str] = {}
+            text_memory = 0
+            have_mode = have_size = False
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                length, chunk_type = _PNG_CHUNK_HEADER.unpack(header)
+                if not _PNG_CHUNK_TYPE.match(chunk_type):
+                    return None
+                if chunk_type == b'IDAT' or chunk_type == b'IEND':
+                    return texts if have_mode and have_size else None
+                data = _read_exactly(f, length)
+                crc = f.read(4)
+                if data is None or len(crc) < 4 or zlib.crc32(data, zlib.crc32(chunk_type)) != int.from_bytes(crc, 'big'):
+                    return None
+
+                if chunk_type == b'IHDR':
+                    # Needs a positive size, a known mode and the standard filter method. As in
+                    # Pillow, a later IHDR replaces the size but an unknown mode keeps the earlier one.
+                    if length < 13 or data[11] != 0:
+                        return None
+                    width, height = struct.unpack('>II', data[:8])
+                    have_size = width > 0 and height > 0
+                    have_mode = have_mode or (data[8], data[9]) in _PNG_MODES
+                    continue
+
+                if chunk_type == b'tEXt':
+                    key, _, value = data.partition(b'\0')
+                    if not key:
+                        continue
+                    text = value.decode('latin-1', 'replace')
+                elif chunk_type == b'zTXt':
+                    key, _, value = data.partition(b'\0')
+                    if value and value[0] != 0:
+                        return None
+                    inflated = _png_inflate(value[1:])
+                    if not key:
+                        continue
+                    text = (inflated or b'').decode('latin-1', 'replace')
+                elif chunk_type == b'iTXt':
+                    key, sep, rest = data.partition(b'\0')
+                    if not sep or len(rest) < 2:
+                        continue
+                    compressed, method, rest = rest[0], rest[1], rest[2:]
+                    parts = rest.split(b'\0', 2)
+                    if len(parts) < 3:
+                        continue
+                    lang, translated, value = parts
+                    if compressed:
+                        if method != 0:
+                            continue
+                        value = _png_inflate(value)
+                        if value is None:
+                            continue
+                    try:
+                        lang.decode('utf-8')
+                        translated.decode('utf-8')
+                        text = value.decode('utf-8')
+                    except UnicodeError:
+                        continue
+                else:
+                    continue
+                texts[key.decode('latin-1')] = text
+                text_memory += len(text)
+                if text_memory > _PNG_MAX_TEXT_MEMORY:
+                    return None
+    except (OSError, ValueError):
+        return None
+
+
+_MP4_BOX_HEADER = struct.Struct('>I4s')
+# Metadata boxes are read whole; anything larger than this is not a tag
+_MP4_MAX_TAG = 64 * 1024 * 1024
+_MP4_ITEM_NAMES = {b'\xa9cmt': 'comment', b'\xa9des': 'description', b'desc': 'description', b'\xa9nam': 'title'}
+
+
+def _mp4_boxes(f, start: int, end: int):
+    """Yield (type, payload start, payload end) for the boxes between two offsets, seeking over their payloads."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = _MP4_BOX_HEADER.unpack(header)
+        offset = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size, offset = int.from_bytes(large, 'big'), 16
+        elif size == 0:
+            size = end - pos
+        if size < offset or pos + size > end:
+            return
+        yield box_type, pos + offset, pos + size
+        pos += size
+
+
+def _mp4_payload(f, start: int, end: int) -> Optional[bytes]:
+    if end - start > _MP4_MAX_TAG:
+        return None
+    f.seek(start)
+    return _read_exactly(f, end - start)
+
+
+def _mp4_data_value(f, start: int, end: int) -> Optional[str]:
+    """The text of the 'data' box inside an ilst item, or None for non-text values."""
+    for box_type, s, e in _mp4_boxes(f, start, end):
+        if box_type != b'data':
+            continue
+        data = _mp4_payload(f, s, e)
+        if data is None or len(data) < 8:
+            return None
+        # 3-byte well-known type after the version byte: 1 = UTF-8, 2 = UTF-16BE
+        kind = int.from_bytes(data[1:4], 'big')
+        if kind == 1:
+            return data[8:].decode('utf-8', 'replace')
+        if kind == 2:
+            return data[8:].decode('utf-16-be', 'replace')
+        return None
+    return None
+
+
+def _read_mp4_meta(f, start: int, end: int, tags: Dict[str, str]) -> None:
+    """Collect the ilst items of a meta box, naming them through its keys box when there is one."""
+    f.seek(start)
+    # ISO meta is a full box (version and flags first); QuickTime's starts straight with hdlr
+    if f.read(8)[4:8] != b'hdlr':
+        start += 4
+    keys: List[str] = []
+    items = []
+    for box_type, s, e in _mp4_boxes(f, start, end):
+        if box_type == b'keys':
+            data = _mp4_payload(f, s, e) or b''
+            pos = 8
+            while pos + 8 <= len(data):
+                size = int.from_bytes(data[pos:pos + 4], 'big')
+                if size < 8:
+                    break
+                keys.append(data[pos + 8:pos + size].decode('utf-8', 'replace'))
+                pos += size
+        elif box_type == b'ilst':
+            items.extend(_mp4_boxes(f, s, e))
+    for item_type, s, e in items:
+        if item_type == b'----':
+            # Freeform item: the name is in a 'name' full box next to the data
+            name = None
+            for child, cs, ce in _mp4_boxes(f, s, e):
+                if child == b'name':
+                    name = (_mp4_payload(f, cs, ce) or b'')[4:].decode('utf-8', 'replace')
+        else:
+            index = int.from_bytes(item_type, 'big')
+            if keys and 1 <= index <= len(keys):
+                name = keys[index - 1]
+            else:
+                name = _MP4_ITEM_NAMES.get(item_type, item_type.decode('latin-1'))
+        value = _mp4_data_value(f, s, e) if name else None
+        if value is not None:
+            tags[name] = value
+
+
+def _read_mp4_udta(f, start: int, end: int, tags: Dict[str, str]) -> None:
+    for box_type, s, e in _mp4_boxes(f, start, end):
+        if box_type == b'meta':
+            _read_mp4_meta(f, s, e, tags)
+        elif box_type[0] == 0xA9:
+            # QuickTime user data text: 16-bit length, 16-bit language, then the string
+            data = _mp4_payload(f, s, e)
+            if data and len(data) >= 4:
+                length = int.from_bytes(data[:2], 'big')
+                name = _MP4_ITEM_NAMES.get(box_type, box_type.decode('latin-1'))
+                tags.setdefault(name, data[4:4 + length].decode('utf-8', 'replace'))
+
+
+def read_mp4_metadata_tags(filename: str) -> Optional[Dict[str, str]]:
+    """
+    Read the text metadata of an MP4/MOV file by walking its boxes: the ilst items under
+    moov/udta/meta or moov/meta (named through the keys box when ffmpeg wrote them with
+    use_metadata_tags, as ComfyUI does), and QuickTime comment atoms in moov/udta.
+
+    Only box headers and the metadata itself are read; mdat and the tracks are seeked over.
+    Returns None when the file has no moov box.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            end = os.fstat(f.fileno()).st_size
+            for box_type, start, stop in _mp4_boxes(f, 0, end):
+                if box_type != b'moov':
+                    continue
+                tags: Dict[str, str] = {}
+                for child, s, e in _mp4_boxes(f, start, stop):
+                    if child == b'udta':
+                        _read_mp4_udta(f, s, e, tags)
+                    elif child == b'meta':
+                        _read_mp4_meta(f, s, e, tags)
+                return tags
+    except (OSError, ValueError):
+        return None
+    return None
+
 
 class MetadataFileExtractor:
     """
@@ -99,39 +355,78 @@ class MetadataFileExtractor:
 
         return {}
 
+    @staticmethod
+    def extract_both_from_open(filename: str, image: Optional[Image.Image] = None, fp: Optional[BinaryIO] = None) -> Dict[str, Any]:
+        """
+        Like extract_both, but reuses a file the caller already has open instead of opening it again.
+
+        Args:
+            filename: Path to the media file (used to pick PNG or media extraction)
+            image: The Pillow image opened from that file; PNG text chunks are read from its info
+            fp: The binary file object the image was opened from; handed to pymediainfo for other files
+
+        Returns:
+            Dictionary containing 'workflow' and 'prompt' keys, or empty dict if extraction fails
+        """
+        if filename.lower().endswith('.png'):
+            if image is None:
+                return MetadataFileExtractor._extract_from_png(filename)
+            return MetadataFileExtractor._extract_from_image(image)
+
+        if PYMEDIAINFO_AVAILABLE:
+            if fp is None:
+                return MetadataFileExtractor._extract_from_media(filename)
+            try:
+                fp.seek(0)
+            except Exception:
+                return MetadataFileExtractor._extract_from_media(filename)
+            return MetadataFileExtractor._extract_from_media(fp)
+
+        return {}
+
     @staticmethod
     def _extract_from_png(filename: str) -> Dict[str, Any]:
-        """Extract metadata from PNG file using Pillow."""
+        """Extract metadata from the text chunks of a PNG file, read without decoding the image."""
+        texts = read_png_text_chunks(filename)
+        if texts is None:
+            return {}
+        return MetadataFileExtractor._parse_prompt_workflow(texts)
+
+    @staticmethod
+    def _extract_from_image(image: Image.Image) -> Dict[str, Any]:
+        """Extract metadata from the text chunks of an opened Pillow image."""
         try:
-            image = Image.open(filename)
-            metadata = image.info
-
-            prompt = metadata.get('prompt')
-            workflow = metadata.get('workflow')
-
-            # Parse JSON strings if they are valid JSON
-            if prompt and isinstance(prompt, str):
-                try:
-                    prompt = json.loads(prompt)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-            if workflow and isinstance(workflow, str):
-                try:
-                    workflow = json.loads(workflow)
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-            return {
-                'prompt': prompt,
-                'workflow': workflow
-            }
+            return MetadataFileExtractor._parse_prompt_workflow(image.info)
         except Exception:
             return {}
 
     @staticmethod
-    def _extract_from_media(filename: str) -> Dict[str, Any]:
-        """Extract metadata from media file using pymediainfo."""
+    def _parse_prompt_workflow(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick 'prompt' and 'workflow' out of PNG text entries, decoding them when they are JSON."""
+        prompt = metadata.get('prompt')
+        workflow = metadata.get('workflow')
+
+        # Parse JSON strings if they are valid JSON
+        if prompt and isinstance(prompt, str):
+            try:
+                prompt = json.loads(prompt)
+            except (json.JSONDecodeError, TypeError):
+                pass
+
+        if workflow and isinstance(workflow, str):
+            try:
+                workflow = json.loads(workflow)
+            except (json.JSONDecodeError, TypeError):
+                pass
+
+        return {
+            'prompt': prompt,
+            'workflow': workflow
+        }
+
+    @staticmethod
+    def _extract_from_media(filename: Union[str, BinaryIO]) -> Dict[str, Any]:
+        """Extract metadata from media file (a path or an open binary file) using pymediainfo."""
         if not PYMEDIAINFO_AVAILABLE:
             return {}
 
@@ -11,6 +11,8 @@ from server import PromptServer
 # noinspection PyPackageRequirements
 from aiohttp import web
 
+from metadata.metadata_file_extractor import read_mp4_metadata_tags
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -36,6 +38,7 @@ except AttributeError:
 
 API_BASE = '/ovum/image-list'
 LMSTUDIO_API_BASE = '/ovum/lmstudio'
+WILDCARDS_API_BASE = '/ovum/wildcards'
 FILES_BASE = '/ovum/files'
 
 
@@ -47,6 +50,77 @@ def _is_subpath(child: Path, parent: Path) -> bool:
         return False
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _workflow_value(obj: Any) -> Any:
+    """Prefer an explicit 'workflow', else 'prompt', else the whole object; JSON strings are decoded."""
+    if not isinstance(obj, dict):
+        return obj
+    if 'workflow' in obj:
+        val = obj['workflow']
+    elif 'prompt' in obj:
+        val = obj['prompt']
+    else:
+        val = obj
+    if isinstance(val, str):
+        try:
+            return json.loads(val)
+        except Exception:
+            return val
+    return val
+
+
+def _extract_json_fragment(data: bytes, anchors=(b'"workflow"', b'"prompt"')) -> Optional[Any]:
+    """
+    Find the JSON object holding a "workflow" (or "prompt") key in raw bytes.
+
+    Anchors and braces are located with bytes.find. Once one is found the window is decoded as
+    latin-1, which keeps character offsets equal to byte offsets, so the C JSON scanner can find
+    where the candidate object ends; only that slice is then decoded as UTF-8 and parsed.
+    """
+    text: Optional[str] = None
+    for anchor in anchors:
+        pos = data.find(anchor)
+        while pos != -1:
+            start = data.rfind(b'{', 0, pos)
+            while start != -1:
+                if text is None:
+                    text = data.decode('latin-1')
+                try:
+                    _, end = _JSON_DECODER.raw_decode(text, start)
+                except ValueError:
+                    break
+                if end > pos:
+                    try:
+                        return _workflow_value(json.loads(data[start:end].decode('utf-8', errors='ignore')))
+                    except ValueError:
+                        break
+                # A nested object that closes before the anchor; try the enclosing one
+                start = data.rfind(b'{', 0, start)
+            pos = data.find(anchor, pos + 1)
+    return None
+
+
+def _workflow_from_mp4_tags(tags: Dict[str, str]) -> Optional[Any]:
+    """Workflow (or prompt) from MP4 metadata tags: separate 'workflow'/'prompt' tags, or JSON in a comment."""
+    by_name = {k.lower(): v for k, v in tags.items()}
+    for name in ('workflow', 'prompt'):
+        if by_name.get(name):
+            return _workflow_value({name: by_name[name]})
+    for name in ('comment', 'description'):
+        value = by_name.get(name)
+        if not value or '{' not in value:
+            continue
+        try:
+            return _workflow_value(json.loads(value))
+        except ValueError:
+            found = _extract_json_fragment(value.encode('utf-8'))
+            if found is not None:
+                return found
+    return None
+
+
 @PromptServer.instance.routes.get(f'{API_BASE}/file')
 async def get_file(request: web.Request):
     """Return raw file content by path query (supports relative to output root)."""
@@ -87,84 +161,23 @@ async def get_meta(request: web.Request):
         height: Optional[int] = None
 
         if suffix == '.mp4':
-            # Attempt to extract embedded workflow JSON-like blob from MP4 bytes.
-            # Strategy: search for a JSON object containing "workflow" (or "prompt")
-            # in the beginning or end chunks of the file to avoid loading very large files.
-            def _extract_json_fragment(data: bytes, anchors=(b'"workflow"', b'"prompt"')) -> Optional[Any]:
-                def _parse_object_from(data_bytes: bytes, start_idx: int) -> Optional[str]:
-                    depth = 0
-                    in_str = False
-                    escaped = False
-                    for i in range(start_idx, len(data_bytes)):
-                        c = data_bytes[i]
-                        if in_str:
-                            if escaped:
-                                escaped = False
-                            elif c == 0x5C:  # backslash
-                                escaped = True
-                            elif c == 0x22:  # quote
-                                in_str = False
-                        else:
-                            if c == 0x22:  # quote
-                                in_str = True
-                            elif c == 0x7B:  # {
-                                depth += 1
-                            elif c == 0x7D:  # }
-                                depth -= 1
-                                if depth == 0:
-                                    try:
-                                        frag = data_bytes[start_idx:i + 1].decode('utf-8', errors='ignore')
-                                        return frag
-                                    except Exception:
-                                        return None
-                    return None
-
-                for anchor in anchors:
-                    pos = data.find(anchor)
-                    while pos != -1:
-                        start = data.rfind(b'{', 0, pos)
-                        if start == -1:
-                            break
-                        frag = _parse_object_from(data, start)
-                        if frag:
+            # Prefer the metadata atoms; scan the raw bytes only when the file has none
+            try:
+                workflow_data = _workflow_from_mp4_tags(read_mp4_metadata_tags(str(path)) or {})
+                if workflow_data is None:
+                    file_size = path.stat().st_size
+                    chunk_size = 10 * 1024 * 1024  # 10MB
+                    data_head = b''
+                    data_tail = b''
+                    with path.open('rb') as f:
+                        data_head = f.read(min(file_size, chunk_size))
+                        if file_size > chunk_size:
                             try:
-                                obj = json.loads(frag)
-                                if isinstance(obj, dict):
-                                    # Prefer explicit 'workflow', else 'prompt', else the whole object
-                                    if 'workflow' in obj:
-                                        val = obj['workflow']
-                                    elif 'prompt' in obj:
-                                        val = obj['prompt']
-                                    else:
-                                        val = obj
-                                    # If the value is a JSON string, try parsing again
-                                    if isinstance(val, str):
-                                        try:
-                                            return json.loads(val)
-                                        except Exception:
-                                            return val
-                                    return val
-                                return obj
+                                f.seek(max(0, file_size - chunk_size))
+                                data_tail = f.read(chunk_size)
                             except Exception:
-                                # If not valid JSON, return the raw fragment
-                                return frag
-                        pos = data.find(anchor, pos + 1)
-                return None
-
-            try:
-                file_size = path.stat().st_size
-                chunk_size = 10 * 1024 * 1024  # 10MB
-                data_head = b''
-                data_tail = b''
-                with path.open('rb') as f:
-                    data_head = f.read(min(file_size, chunk_size))
-                    if file_size > chunk_size:
-                        try:
-                            f.seek(max(0, file_size - chunk_size))
-                            data_tail = f.read(chunk_size)
-                        except Exception:
-                            data_tail = b''
-                workflow_data = _extract_json_fragment(data_head) or _extract_json_fragment(data_tail)
+                                data_tail = b''
+                    workflow_data = _extract_json_fragment(data_head) or _extract_json_fragment(data_tail)
             except Exception:
                 workflow_data = None
 
@@ -227,6 +240,14 @@ async def get_meta(request: web.Request):
         return web.json_response({"error": True, "message": str(e)}, status=500)
 
 
+@PromptServer.instance.routes.get(f'{API_BASE}/status')
+async def image_list_status(request: web.Request):
+    """Image list loader progress: files scanned, decoded (from files, cache or prefetch), bytes read and throughput of the current or last load."""
+    # Lazy import to avoid circulars at module import time
+    from image_list_loader import IMAGE_LIST_STATUS  # type: ignore
+    return web.json_response(IMAGE_LIST_STATUS.status())
+
+
 @PromptServer.instance.routes.get(f'{API_BASE}/search')
 async def search(request: web.Request):
     """Recursive search under OUTPUT_ROOT for files matching regex pattern."""
@@ -289,6 +310,13 @@ async def refresh_lmstudio_models(request: web.Request):
         logger.exception("[ovum] Failed to refresh LM Studio models")
         return web.json_response({"ok": False, "error": str(e)}, status=500)
 
+@PromptServer.instance.routes.get(f"{WILDCARDS_API_BASE}/status")
+async def wildcards_status(request: web.Request):
+    """Wildcard cache and background preloader status: files, bytes, last refresh time."""
+    # Lazy import to avoid circulars at module import time
+    from wildcard_store import WILDCARD_PRELOADER  # type: ignore
+    return web.json_response(WILDCARD_PRELOADER.status())
+
 @PromptServer.instance.routes.get(f"{FILES_BASE}/{{directory_type}}")
 @PromptServer.instance.routes.get(f"{FILES_BASE}/{{directory_type}}/{{subpath:.*}}")
 async def get_files(request: web.Request) -> web.Response:
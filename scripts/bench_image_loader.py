@@ -0,0 +1,196 @@
+# scripts/bench_image_loader.py
+"""
+Benchmarks for LoadImagesListWithCallback.
+
+Run from a ComfyUI checkout so that ``torch``, ``server`` and ``folder_paths`` are importable, e.g.:
+    python custom_nodes/comfy-ovum/scripts/bench_image_loader.py
+
+A throwaway directory of generated PNG/JPEG files is created for the duration of the run.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import image_list_loader as il  # noqa: E402
+
+
+def write_images(root: Path, count: int, size: int) -> None:
+    """Alternate PNG (with alpha every fourth image) and JPEG; smooth gradients plus noise so they compress realistically."""
+    rng = np.random.default_rng(0)
+    ramp = np.linspace(0, 255, size, dtype=np.float32)
+    for i in range(count):
+        base = (ramp[None, :, None] + ramp[:, None, None] * (i % 3)) % 256
+        noise = rng.normal(0, 12, (size, size, 3))
+        rgb = np.clip(base + noise, 0, 255).astype(np.uint8)
+        if i % 2 == 0:
+            image = Image.fromarray(rgb)
+            if i % 4 == 0:
+                image.putalpha(Image.fromarray(np.full((size, size), 200, np.uint8)))
+            image.save(root / f'img_{i:05d}.png')
+        else:
+            Image.fromarray(rgb).save(root / f'img_{i:05d}.jpg', quality=90)
+
+
+def timed(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_decode(args, root: Path) -> None:
+    node = il.LoadImagesListWithCallback()
+    node.load_images(directory=str(root), image_load_cap=args.count, decode_workers=1)  # warm the listing cache and file cache
+    sequential = timed(lambda: node.load_images(directory=str(root), image_load_cap=args.count, decode_workers=1), args.repeat)
+    print(f'{args.count} images of {args.size}px, {os.cpu_count()} cpus')
+    print(f'  workers  1: {sequential * 1000:8.1f} ms')
+    workers = 2
+    while workers <= args.max_workers:
+        elapsed = timed(lambda: node.load_images(directory=str(root), image_load_cap=args.count, decode_workers=workers), args.repeat)
+        print(f'  workers {workers:2d}: {elapsed * 1000:8.1f} ms  ({sequential / elapsed:.1f}x)')
+        workers *= 2
+
+
+def bench_draft(args, root: Path) -> None:
+    photos = root / 'photos'
+    photos.mkdir()
+    rng = np.random.default_rng(1)
+    for i in range(args.photos):
+        small = rng.integers(0, 256, (args.photo_size // 64, args.photo_size // 64, 3), dtype=np.uint8)
+        Image.fromarray(small).resize((args.photo_size, args.photo_size * 3 // 4), Image.Resampling.BICUBIC) \
+            .save(photos / f'photo_{i:03d}.jpg', quality=92)
+    node = il.LoadImagesListWithCallback()
+
+    def load(max_side):
+        return node.load_images(directory=str(photos), decode_workers=1, max_side=max_side)
+
+    load(0)
+    full = timed(lambda: load(0), args.repeat)
+    full_bytes = sum(t.nbytes for t in load(0)[0])
+    print(f'{args.photos} JPEGs of {args.photo_size}px')
+    print(f'  full decode     : {full * 1000:8.1f} ms  {full_bytes / 2 ** 20:8.1f} MiB')
+    for max_side in args.max_side:
+        elapsed = timed(lambda: load(max_side), args.repeat)
+        size = sum(t.nbytes for t in load(max_side)[0])
+        print(f'  max_side {max_side:6d}: {elapsed * 1000:8.1f} ms  {size / 2 ** 20:8.1f} MiB  '
+              f'({full / elapsed:.1f}x faster, {full_bytes / size:.0f}x less memory)')
+
+
+def bench_cache(args, root: Path) -> None:
+    from decoded_image_cache import DecodedImageCache
+    node = il.LoadImagesListWithCallback()
+    previous = il.DECODED_IMAGE_CACHE
+    with tempfile.TemporaryDirectory(prefix='ovum-decoded-') as cache_dir:
+        il.DECODED_IMAGE_CACHE = DecodedImageCache(cache_dir)
+        try:
+            def load(cached):
+                return node.load_images(directory=str(root), image_load_cap=args.count, decode_workers=1, decoded_cache=cached)
+
+            uncached = timed(lambda: load(False), args.repeat)
+            start = time.perf_counter()
+            load(True)
+            cold = time.perf_counter() - start
+            warm = timed(lambda: load(True), args.repeat)
+            print(f'{args.count} images of {args.size}px')
+            print(f'  no cache  : {uncached * 1000:8.1f} ms')
+            print(f'  cold cache: {cold * 1000:8.1f} ms (decode and write)')
+            print(f'  warm cache: {warm * 1000:8.1f} ms ({uncached / warm:.1f}x)')
+            print(f'  {il.DECODED_IMAGE_CACHE.stats()}')
+        finally:
+            il.DECODED_IMAGE_CACHE = previous
+
+
+def bench_memory(args, root: Path) -> None:
+    if args.measure:
+        node = il.LoadImagesListWithCallback()
+        start = time.perf_counter()
+        out = node.load_images(directory=str(root), decode_workers=args.workers,
+                               uint8_pixels=args.measure == 'uint8', memory_mapped=args.measure == 'mapped')
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+        size = sum(t.nbytes for t in out[0])
+        # One pass over every output, as a consumer iterating the list would do
+        start = time.perf_counter()
+        for t in out[0]:
+            float(t.mean())
+        read = time.perf_counter() - start
+        print(f'  {args.measure:7s} workers {args.workers}: {len(out[0])} images in {elapsed * 1000:8.1f} ms, '
+              f'peak RSS {peak:8.1f} MiB, outputs {size / 2 ** 20:8.1f} MiB, read back at {size / 2 ** 20 / read:8.1f} MiB/s')
+        return
+    print(f'{args.count} images of {args.size}px, each load in a fresh process')
+    for workers in (1, args.workers):
+        for mode in ('float32', 'uint8', 'mapped'):
+            subprocess.run([sys.executable, __file__, '--directory', str(root), 'memory',
+                            '--measure', mode, '--workers', str(workers)], check=True)
+
+
+def bench_pages(args, root: Path) -> None:
+    """Walk the directory page by page; the sleep stands in for the rest of the workflow between queues."""
+    node = il.LoadImagesListWithCallback()
+    print(f'{args.count} images of {args.size}px, pages of {args.page}, {args.work * 1000:.0f} ms of other work per page')
+    for prefetch in (False, True):
+        il.PAGE_PREFETCHER.clear()
+        waited = 0.0
+        start = time.perf_counter()
+        for index in range(0, args.count, args.page):
+            t = time.perf_counter()
+            node.load_images(directory=str(root), start_index=index, image_load_cap=args.page, prefetch_next=prefetch)
+            waited += time.perf_counter() - t
+            time.sleep(args.work)
+        total = time.perf_counter() - start
+        print(f'  prefetch {"on " if prefetch else "off"}: {total * 1000:8.1f} ms total, {waited * 1000:8.1f} ms inside the loader')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=64, help='images to generate and load')
+    parser.add_argument('--size', type=int, default=1024, help='width and height of the generated images')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the best is reported')
+    parser.add_argument('--directory', help='use this image directory instead of generating one')
+    parser.set_defaults(func=bench_decode)
+    commands = parser.add_subparsers(title='benchmarks')
+    decode = commands.add_parser('decode', help='sequential versus pooled decoding of one page (default)')
+    decode.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    decode.set_defaults(func=bench_decode)
+    draft = commands.add_parser('draft', help='full decode versus max_side reduced decode of large JPEGs')
+    draft.add_argument('--photos', type=int, default=8)
+    draft.add_argument('--photo-size', type=int, default=6000, help='width of the generated 4:3 JPEGs')
+    draft.add_argument('--max-side', type=int, nargs='+', default=[2048, 1024, 512])
+    draft.set_defaults(func=bench_draft)
+    commands.add_parser('cache', help='decoding versus the on-disk decoded image cache') \
+        .set_defaults(func=bench_cache)
+    memory = commands.add_parser('memory', help='peak RSS and time of float32, uint8_pixels and memory_mapped loading')
+    memory.add_argument('--workers', type=int, default=il.DEFAULT_DECODE_WORKERS)
+    memory.add_argument('--measure', choices=('float32', 'uint8', 'mapped'), help=argparse.SUPPRESS)
+    memory.set_defaults(func=bench_memory)
+    pages = commands.add_parser('pages', help='paging through a directory with and without prefetch_next')
+    pages.add_argument('--page', type=int, default=16)
+    pages.add_argument('--work', type=float, default=0.5, help='seconds of simulated downstream work per page')
+    pages.set_defaults(func=bench_pages)
+    args = parser.parse_args()
+    if not hasattr(args, 'max_workers'):
+        args.max_workers = os.cpu_count() or 1
+
+    if args.directory:
+        args.func(args, Path(args.directory))
+        return
+    with tempfile.TemporaryDirectory(prefix='ovum-images-') as tmp:
+        write_images(Path(tmp), args.count, args.size)
+        args.func(args, Path(tmp))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# scripts/bench_metadata.py
+"""
+Benchmarks for prompt/workflow metadata extraction.
+
+Point --directory at a folder of real ComfyUI outputs, e.g.:
+    python custom_nodes/comfy-ovum/scripts/bench_metadata.py --directory output
+
+Without --directory, a throwaway folder of ComfyUI-style outputs is generated for the run:
+1024px PNGs with a prompt and workflow text chunk each, or MP4s laid out the way ffmpeg writes
+them with use_metadata_tags (media data first, then a moov box carrying prompt/workflow tags).
+"""
+import argparse
+import gc
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, PngImagePlugin
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metadata.metadata_file_extractor import MetadataFileExtractor, read_mp4_metadata_tags, read_png_text_chunks  # noqa: E402
+
+
+def pillow_text_chunks(filename: str):
+    with Image.open(filename) as image:
+        return dict(image.info)
+
+
+def extract_with_pillow(filename: str):
+    """How MetadataFileExtractor._extract_from_png read PNGs before it walked the chunks itself."""
+    try:
+        with Image.open(filename) as image:
+            return MetadataFileExtractor._extract_from_image(image)
+    except Exception:
+        return {}
+
+
+def prompt_and_workflow(nodes: int):
+    prompt = {str(i): {"class_type": "KSampler", "inputs": {"seed": i, "steps": 20, "cfg": 7.0,
+                                                            "model": [str(i + 1), 0], "positive": "a" * 200}}
+              for i in range(nodes)}
+    workflow = {"nodes": [{"id": i, "type": "KSampler", "pos": [i, i], "size": [300, 200],
+                           "widgets_values": [i, "fixed", 20, 7.0, "euler", "normal", 1.0]} for i in range(nodes)],
+                "links": [[i, i, 0, i + 1, 0, "MODEL"] for i in range(nodes)], "version": 0.4}
+    return prompt, workflow
+
+
+def write_outputs(root: Path, args) -> None:
+    """PNGs laid out like ComfyUI's SaveImage: prompt and workflow tEXt chunks ahead of the pixels."""
+    rng = np.random.default_rng(0)
+    prompt, workflow = prompt_and_workflow(args.nodes)
+    size = args.size
+    for i in range(args.count):
+        info = PngImagePlugin.PngInfo()
+        info.add_text("prompt", json.dumps(prompt))
+        info.add_text("workflow", json.dumps(workflow))
+        pixels = rng.integers(0, 256, (size // 16, size // 16, 3), dtype=np.uint8)
+        Image.fromarray(pixels).resize((size, size), Image.Resampling.BICUBIC).save(root / f'ComfyUI_{i:05d}_.png', pnginfo=info)
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def write_videos(root: Path, args) -> None:
+    """MP4 box layout of ComfyUI's SaveVideo (ffmpeg, movflags use_metadata_tags); the media data is filler."""
+    prompt, workflow = prompt_and_workflow(args.nodes)
+    tags = {'prompt': json.dumps(prompt), 'workflow': json.dumps(workflow)}
+    keys = box(b'keys', struct.pack('>II', 0, len(tags)) +
+               b''.join(box(b'mdta', name.encode()) for name in tags))
+    ilst = box(b'ilst', b''.join(box((i + 1).to_bytes(4, 'big'), box(b'data', struct.pack('>II', 1, 0) + value.encode()))
+                                 for i, value in enumerate(tags.values())))
+    meta = box(b'meta', bytes(4) + box(b'hdlr', bytes(8) + b'mdta' + bytes(13)) + keys + ilst)
+    moov = box(b'moov', box(b'mvhd', bytes(100)) + box(b'trak', bytes(64 * 1024)) + box(b'udta', meta))
+    filler = os.urandom(1 << 20)
+    for i in range(args.count):
+        with open(root / f'ComfyUI_{i:05d}_.mp4', 'wb') as f:
+            f.write(box(b'ftyp', b'isom\0\0\2\0isomiso2avc1mp41'))
+            f.write(struct.pack('>I4s', 8 + len(filler) * args.video_mb, b'mdat'))
+            for _ in range(args.video_mb):
+                f.write(filler)
+            f.write(moov)
+
+
+def head_and_tail(filename: str, chunk_size: int = 10 * 1024 * 1024) -> bytes:
+    """What the /meta route read from every MP4 before it walked the boxes."""
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        data = f.read(min(size, chunk_size))
+        if size > chunk_size:
+            f.seek(max(0, size - chunk_size))
+            data += f.read(chunk_size)
+    return data
+
+
+def bytes_read() -> int:
+    """Bytes this process has read through read() calls so far (Linux); -1 elsewhere."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
+
+
+def measure(label: str, extract, files, repeat: int, reference=None):
+    results = None
+    best = float('inf')
+    read = 0
+    for _ in range(repeat):
+        # Collections triggered by json.loads would otherwise land on whichever run is unlucky
+        results = None
+        gc.collect()
+        gc.disable()
+        try:
+            before = bytes_read()
+            start = time.perf_counter()
+            results = [extract(str(f)) for f in files]
+            best = min(best, time.perf_counter() - start)
+            read = bytes_read() - before
+        finally:
+            gc.enable()
+    per_file = f'{read / len(files) / 1024:8.1f} KiB read per file' if read >= 0 else ''
+    print(f'  {label:16s}: {best * 1000:8.1f} ms ({best / len(files) * 1e6:7.1f} us per file) {per_file}')
+    if reference is not None and results != reference:
+        mismatched = sum(1 for a, b in zip(results, reference) if a != b)
+        print(f'    !! {mismatched} files differ from the Pillow path')
+    return best, results
+
+
+def bench_png(args, root: Path) -> None:
+    files = sorted(p for p in root.rglob('*.png') if p.is_file())[:args.limit or None]
+    if not files:
+        print(f'no PNG files under {root}')
+        return
+    total = sum(os.path.getsize(f) for f in files)
+    print(f'{len(files)} PNGs, {total / len(files) / 1024:.0f} KiB on average')
+    print(' text chunks only')
+    pillow, reference = measure('Pillow open/info', pillow_text_chunks, files, args.repeat)
+    walker, _ = measure('chunk walker', read_png_text_chunks, files, args.repeat,
+                        [{k: v for k, v in r.items() if isinstance(v, str)} for r in reference])
+    print(f'  {pillow / walker:.1f}x faster')
+    print(' prompt/workflow extraction, including json.loads')
+    pillow, reference = measure('Pillow open/info', extract_with_pillow, files, args.repeat)
+    walker, _ = measure('chunk walker', MetadataFileExtractor._extract_from_png, files, args.repeat, reference)
+    print(f'  {pillow / walker:.1f}x faster')
+
+
+def bench_mp4(args, root: Path) -> None:
+    files = sorted(p for p in root.rglob('*.mp4') if p.is_file())[:args.limit or None]
+    if not files:
+        print(f'no MP4 files under {root}')
+        return
+    total = sum(os.path.getsize(f) for f in files)
+    print(f'{len(files)} MP4s, {total / len(files) / 2 ** 20:.0f} MiB on average')
+    scan, _ = measure('10MB head+tail', head_and_tail, files, args.repeat)
+    walk, _ = measure('box walker', read_mp4_metadata_tags, files, args.repeat)
+    print(f'  {scan / walk:.1f}x faster, before any JSON scanning of the head and tail')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', help='folder of ComfyUI outputs to scan (searched recursively)')
+    parser.add_argument('--limit', type=int, default=0, help='scan at most this many files (0 = all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the best is reported')
+    parser.add_argument('--count', type=int, default=200, help='files to generate without --directory')
+    parser.add_argument('--size', type=int, default=1024, help='width and height of generated PNGs')
+    parser.add_argument('--nodes', type=int, default=40, help='nodes in the generated prompt/workflow')
+    parser.set_defaults(func=bench_png, generate=write_outputs)
+    commands = parser.add_subparsers(title='benchmarks')
+    commands.add_parser('png', help='Pillow versus the PNG chunk walker (default)') \
+        .set_defaults(func=bench_png, generate=write_outputs)
+    mp4 = commands.add_parser('mp4', help='head/tail reads versus the MP4 box walker of the /meta route')
+    mp4.add_argument('--video-mb', type=int, default=64, help='media data per generated MP4, in MiB')
+    mp4.set_defaults(func=bench_mp4, generate=write_videos)
+    args = parser.parse_args()
+
+    if args.directory:
+        args.func(args, Path(args.directory))
+        return
+    with tempfile.TemporaryDirectory(prefix='ovum-metadata-') as tmp:
+        args.generate(Path(tmp), args)
+        args.func(args, Path(tmp))
+
+
+if __name__ == '__main__':
+    main()
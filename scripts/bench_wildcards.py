@@ -0,0 +1,362 @@
+# scripts/bench_wildcards.py
+"""
+Benchmarks for wildcard prompt expansion.
+
+Run from a ComfyUI checkout so that ``folder_paths`` is importable, e.g.:
+    python custom_nodes/comfy-ovum/scripts/bench_wildcards.py
+
+A throwaway wildcard directory is generated and installed as the user directory
+for the duration of the run.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# noinspection PyUnresolvedReferences
+import folder_paths  # noqa: E402
+import wildcard_processor as wp  # noqa: E402
+import wildcard_store  # noqa: E402
+from wildcard_store import WILDCARD_STORE  # noqa: E402
+
+
+def write_wildcards(root: Path, depth: int, width: int, lines: int) -> None:
+    """level0 .. level{depth}; each line of level N references level N+1 a few times."""
+    wc_dir = root / 'wildcards'
+    wc_dir.mkdir(parents=True, exist_ok=True)
+    for level in range(depth + 1):
+        with open(wc_dir / f'level{level}.txt', 'w', encoding='utf-8') as f:
+            f.write('# generated\n')
+            for i in range(lines):
+                if level < depth:
+                    refs = ' '.join(f'__level{level + 1}__' for _ in range(width))
+                    f.write(f'l{level}-{i} {refs} <random:0:1>\n')
+                else:
+                    f.write(f'leaf-{i} {{red|green|blue}}\n')
+
+
+def legacy_expand(prompt, seed, extra_pnginfo, prompt_):
+    """The multi-pass loop OvumWildcardProcessor.process used before prompts were compiled."""
+    prompt = wp.strip_all_comments(prompt)
+    prompt = wp.search_and_replace(prompt, extra_pnginfo, prompt_)
+    prompt = wp.process_random_syntax(prompt, seed)
+    new_prompt = wp.find_and_replace_wildcards(prompt, seed)
+    if new_prompt != prompt:
+        for _ in range(10):
+            prompt = new_prompt
+            prompt = wp.search_and_replace(prompt, extra_pnginfo, prompt_)
+            prompt = wp.process_random_syntax(prompt, seed)
+            new_prompt = wp.find_and_replace_wildcards(prompt, seed)
+            if new_prompt == prompt:
+                break
+    new_prompt = wp.strip_all_comments(new_prompt)
+    return wp.process_wildcard_syntax(new_prompt, seed)
+
+
+def legacy_search_and_replace(text, extra_pnginfo, prompt):
+    """search_and_replace as it was before workflows were indexed, for comparison."""
+    if extra_pnginfo is None or prompt is None:
+        return text
+    # if %date: in text, then replace with date
+    #print(text)
+    if '%date:' in text:
+        for match in re.finditer(r'%date:(.*?)%', text):
+            date_match = match.group(1)
+            cursor = 0
+            date_pattern = ''
+            now = datetime.datetime.now()
+
+            pattern_map = {
+                'yyyy': now.strftime('%Y'),
+                'yy': now.strftime('%y'),
+                'MM': now.strftime('%m'),
+                'M': now.strftime('%m').lstrip('0'),
+                'dd': now.strftime('%d'),
+                'd': now.strftime('%d').lstrip('0'),
+                'hh': now.strftime('%H'),
+                'h': now.strftime('%H').lstrip('0'),
+                'mm': now.strftime('%M'),
+                'm': now.strftime('%M').lstrip('0'),
+                'ss': now.strftime('%S'),
+                's': now.strftime('%S').lstrip('0')
+            }
+
+            sorted_keys = sorted(pattern_map.keys(), key=len, reverse=True)
+
+            while cursor < len(date_match):
+                replaced = False
+                for key in sorted_keys:
+                    if date_match.startswith(key, cursor):
+                        date_pattern += pattern_map[key]
+                        cursor += len(key)
+                        replaced = True
+                        break
+                if not replaced:
+                    date_pattern += date_match[cursor]
+                    cursor += 1
+
+            text = text.replace('%date:' + match.group(1) + '%', date_pattern)
+    # Parse JSON if they are strings
+    if isinstance(extra_pnginfo, str):
+        extra_pnginfo = json.loads(extra_pnginfo)
+    if isinstance(prompt, str):
+        prompt = json.loads(prompt)
+
+    # Map from "Node name for S&R" to id in the workflow
+    node_to_id_map = {}
+    try:
+        for node in extra_pnginfo['workflow']['nodes']:
+            node_name = node['properties'].get('Node name for S&R')
+            node_id = node['id']
+            node_to_id_map[node_name] = node_id
+    except:
+        return text
+
+    # Find all patterns in the text that need to be replaced
+    patterns = re.findall(r"%([^%]+)%", text)
+    for pattern in patterns:
+        # Split the pattern to get the node name and widget name
+        node_name, widget_name = pattern.split('.')
+
+        # Find the id for this node name
+        node_id = node_to_id_map.get(node_name)
+        if node_id is None:
+            print(f"No node with name {node_name} found.")
+            # check if user entered id instead of node name
+            if node_name in node_to_id_map.values():
+                node_id = node_name
+            else:
+                continue
+
+        # Find the value of the specified widget in prompt JSON
+        prompt_node = prompt.get(str(node_id))
+        if prompt_node is None:
+            print(f"No prompt data for node with id {node_id}.")
+            continue
+
+        widget_value = prompt_node['inputs'].get(widget_name)
+        if widget_value is None:
+            print(f"No widget with name {widget_name} found for node {node_name}.")
+            continue
+
+        # Replace the pattern in the text
+        text = text.replace(f"%{pattern}%", str(widget_value))
+
+    return text
+
+
+def compiled_expand(prompt, seed, extra_pnginfo, prompt_):
+    return wp.OvumWildcardProcessor().process(prompt, seed, prompt_, extra_pnginfo)[0]
+
+
+def measure(fn, prompt, seeds):
+    outputs = []
+    start = time.perf_counter()
+    for seed in seeds:
+        outputs.append(fn(prompt, seed, {}, {}))
+    elapsed = time.perf_counter() - start
+    return outputs, len(seeds) / elapsed if elapsed else float('inf')
+
+
+def bench_nested(args):
+    prompt = ' '.join(['__level0__'] * args.width) + ', {photo|painting} of a {cat|dog}'
+    seeds = list(range(args.count))
+    before, before_rate = measure(legacy_expand, prompt, seeds)
+    after, after_rate = measure(compiled_expand, prompt, seeds)
+    if before != after:
+        mismatches = sum(1 for a, b in zip(before, after) if a != b)
+        print(f'WARNING: {mismatches} of {len(seeds)} outputs differ')
+    print(f'nested depth={args.depth} width={args.width} lines={args.lines}: '
+          f'{before_rate:,.1f} prompts/s before, {after_rate:,.1f} prompts/s after '
+          f'({after_rate / before_rate:.1f}x)')
+    print(f'wildcard store: {WILDCARD_STORE.stats()}')
+
+
+def stress_concurrency(args):
+    """Expand the same seeds sequentially and from a thread pool; every result must match."""
+    prompt = ' '.join(['__level0__'] * args.width) + ', {2$$, $$a|b|3#c|d} <random:1:5> {photo|painting}'
+    seeds = list(range(args.count))
+    expected, _ = measure(compiled_expand, prompt, seeds)
+    start = time.perf_counter()
+    mismatches = 0
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for _ in range(args.rounds):
+            # Reverse the order each round so threads interleave differently
+            seeds.reverse()
+            results = pool.map(lambda seed: (seed, compiled_expand(prompt, seed, {}, {})), seeds)
+            mismatches += sum(1 for seed, text in results if text != expected[seed])
+    elapsed = time.perf_counter() - start
+    total = args.rounds * len(seeds)
+    print(f'concurrency: {total} expansions on {args.threads} threads in {elapsed:.2f}s, '
+          f'{mismatches} differed from the sequential run')
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_large(args):
+    """Pick lines from one very large wildcard file, served from its sidecar line index."""
+    path = Path(wp.get_wildcard_path()) / 'large.txt'
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(args.large_lines):
+            f.write(f'artist number {i} in the {("red", "green", "blue")[i % 3]} period\n')
+    size = path.stat().st_size
+
+    start = time.perf_counter()
+    lines = wildcard_store.read_wildcard_lines(str(path))
+    read_time = time.perf_counter() - start
+    del lines
+
+    WILDCARD_STORE.invalidate()
+    start = time.perf_counter()
+    WILDCARD_STORE.get(str(path))
+    index_time = time.perf_counter() - start
+    WILDCARD_STORE.invalidate()
+    start = time.perf_counter()
+    WILDCARD_STORE.get(str(path))
+    reopen_time = time.perf_counter() - start
+
+    _, rate = measure(compiled_expand, '__large__', list(range(args.count)))
+    print(f'large file: {args.large_lines:,} lines, {size / 2 ** 20:.1f} MiB; '
+          f'full read {read_time * 1000:.1f} ms, index build {index_time * 1000:.1f} ms, '
+          f'index reopen {reopen_time * 1000:.2f} ms; {rate:,.1f} prompts/s')
+    print(f'wildcard store: {WILDCARD_STORE.stats()}')
+
+
+def make_workflow(nodes):
+    workflow = {'nodes': []}
+    prompt = {}
+    for i in range(1, nodes + 1):
+        workflow['nodes'].append({'id': i, 'type': 'KSampler', 'title': f'Sampler {i}',
+                                  'properties': {'Node name for S&R': f'Node{i}'}})
+        prompt[str(i)] = {'class_type': 'KSampler', 'inputs': {'seed': i * 7, 'steps': 20 + i % 10, 'cfg': 7.5}}
+    return {'workflow': workflow}, prompt
+
+
+def bench_references(args):
+    """%Node.widget% and %date:..% substitution on a large workflow, as one prompt and as many wildcard lines."""
+    extra_pnginfo, prompt_ = make_workflow(args.nodes)
+    step = max(1, args.nodes // args.refs)
+    refs = [f'%Node{i}.{("seed", "steps", "cfg")[i % 3]}%' for i in range(1, args.nodes + 1, step)]
+    prompt = ' '.join(refs) + ' %date:yyyy-MM-dd hh:mm:ss% %date:yyMMdd%'
+    # Every wildcard line inserted during an execution is substituted on its own
+    lines = [f'line {n} with {ref} and %date:yyMMdd%' for n, ref in enumerate(refs)]
+    rounds = max(1, args.count // 10)
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = fn()
+        return result, (time.perf_counter() - start) / rounds
+
+    before, before_time = timed(lambda: legacy_search_and_replace(prompt, extra_pnginfo, prompt_))
+    after, after_time = timed(lambda: wp.search_and_replace(prompt, extra_pnginfo, prompt_))
+    lines_before, lines_before_time = timed(
+        lambda: [legacy_search_and_replace(line, extra_pnginfo, prompt_) for line in lines])
+    lines_after, lines_after_time = timed(
+        lambda: list(map(wp.make_substitution(extra_pnginfo, prompt_), lines)))
+
+    if before != after or lines_before != lines_after:
+        print('WARNING: substituted text differs (a date may have ticked over)')
+    print(f'references: {args.nodes} nodes; one prompt with {len(refs)} references '
+          f'{before_time * 1000:.2f} ms before, {after_time * 1000:.2f} ms after '
+          f'({before_time / after_time:.1f}x); {len(lines)} lines with one reference each '
+          f'{lines_before_time * 1000:.2f} ms before, {lines_after_time * 1000:.2f} ms after '
+          f'({lines_before_time / lines_after_time:.1f}x)')
+
+
+def legacy_strip_all_comments(text):
+    text = re.sub(r'(?s)<!--.*?-->', '', text)
+    text = re.sub(r'(?m)^\s*#.*$', '', text)
+    return text
+
+
+def legacy_strip_all_syntax(text):
+    text = re.sub(r'<lora:(.*?)>', '', text)
+    text = re.sub(r'<lora:(.*?):(.*?)>', '', text)
+    text = re.sub(r'<style:(.*?)>', '', text)
+    text = re.sub(r'__(.*?)__', '', text)
+    text = re.sub(r'__(.*?)\|(.*?)__', '', text)
+    text = re.sub(r'\[\d+\$(.*?)\]', '', text)
+    text = re.sub(r'\[\d+\$(.*?)\|(.*?)\]', '', text)
+    text = text.replace('  ', ' ')
+    text = text.replace(',,', ',')
+    text = text.replace(' , ', ', ')
+    text = text.strip(' ,')
+    text = text.replace('<', '').replace('>', '').replace('[', '').replace(']', '').replace('_', '')
+    return text
+
+
+def bench_strip(args):
+    """strip_all_comments / strip_all_syntax on long prompts, against the old re.sub chains."""
+    line = ('a photo of __subject__ <lora:detail:0.6> in [2$__place__] , with <style:film>, '
+            '{red|blue} <!-- note --> and more words here')
+    blocks = [line] * 40 + ['# a comment line', '  # an indented comment', 'plain text, more plain text']
+    prompts = {
+        'all syntax': '\n'.join(blocks * max(1, args.count // 40)),
+        'expanded': '\n'.join(['a photo of a cat in a garden, (masterpiece:1.2), soft light'] * args.count * 2),
+    }
+    rounds = 200
+
+    def timed(fn, prompt):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = fn(prompt)
+        return result, (time.perf_counter() - start) / rounds
+
+    for kind, prompt in prompts.items():
+        for name, old, new in (('comments', legacy_strip_all_comments, wp.strip_all_comments),
+                               ('syntax', legacy_strip_all_syntax, wp.strip_all_syntax)):
+            before, before_time = timed(old, prompt)
+            after, after_time = timed(new, prompt)
+            if before != after:
+                print(f'WARNING: {name} output differs')
+            print(f'strip {name}, {kind} prompt of {len(prompt):,} chars: {before_time * 1e6:,.0f} us before, '
+                  f'{after_time * 1e6:,.0f} us after ({before_time / after_time:.1f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=4, help='nesting depth of generated wildcard files')
+    parser.add_argument('--width', type=int, default=2, help='wildcard references per line')
+    parser.add_argument('--lines', type=int, default=200, help='lines per generated wildcard file')
+    parser.add_argument('--count', type=int, default=200, help='number of seeds to expand')
+    parser.set_defaults(func=bench_nested)
+    commands = parser.add_subparsers(title='benchmarks')
+    commands.add_parser('nested', help='compare the old pass loop with compiled templates (default)') \
+        .set_defaults(func=bench_nested)
+    references = commands.add_parser('references', help='%%Node.widget%% substitution on a large workflow')
+    references.add_argument('--nodes', type=int, default=500)
+    references.add_argument('--refs', type=int, default=200, help='references in the prompt')
+    references.set_defaults(func=bench_references)
+    commands.add_parser('strip', help='comment and syntax stripping on long prompts') \
+        .set_defaults(func=bench_strip)
+    large = commands.add_parser('large', help='pick lines from one very large, sidecar-indexed file')
+    large.add_argument('--large-lines', type=int, default=500000)
+    large.set_defaults(func=bench_large)
+    stress = commands.add_parser('concurrency', help='check that concurrent expansion is deterministic')
+    stress.add_argument('--threads', type=int, default=16)
+    stress.add_argument('--rounds', type=int, default=5)
+    stress.set_defaults(func=stress_concurrency)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='ovum-wildcards-') as tmp:
+        write_wildcards(Path(tmp), args.depth, args.width, args.lines)
+        previous_user_dir = folder_paths.get_user_directory()
+        folder_paths.set_user_directory(tmp)
+        try:
+            args.func(args)
+        finally:
+            folder_paths.set_user_directory(previous_user_dir)
+
+
+if __name__ == '__main__':
+    main()
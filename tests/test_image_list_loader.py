@@ -0,0 +1,42 @@
+# tests/test_image_list_loader.py
+"""
+Run from a ComfyUI checkout so that ``torch``, ``server`` and ``comfy`` are importable, e.g.:
+    python -m pytest custom_nodes/comfy-ovum/tests
+"""
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, PngImagePlugin
+
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("torch")
+pytest.importorskip("server")
+il = pytest.importorskip("image_list_loader")
+
+
+def test_size_filter_rejects_png_without_decoding(tmp_path, monkeypatch):
+    Image.fromarray(np.zeros((600, 800, 3), np.uint8)).save(tmp_path / 'wide.png')
+    loads = []
+    original = PngImagePlugin.PngImageFile.load
+
+    def load(self):
+        loads.append(self.filename)
+        return original(self)
+
+    monkeypatch.setattr(PngImagePlugin.PngImageFile, 'load', load)
+    out = il.LoadImagesListWithCallback().load_images(directory=str(tmp_path), max_width=512, decode_workers=1)
+    assert len(out[0]) == 0
+    assert loads == []
+
+
+def test_oriented_size_reads_jpeg_orientation(tmp_path):
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.fromarray(np.zeros((400, 800, 3), np.uint8)).save(tmp_path / 'rotated.jpg', exif=exif)
+    with Image.open(tmp_path / 'rotated.jpg') as i:
+        assert il.oriented_size(i) == (400, 800)
@@ -1,145 +1,299 @@
 # noinspection PyUnresolvedReferences
 import folder_paths
 import datetime
+import hashlib
 import json
 import os
 import random
 import re
-from braceexpand import braceexpand, UnbalancedBracesError
+import string
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from braceexpand import UnbalancedBracesError
 
+from wildcard_store import WILDCARD_PRELOADER, WILDCARD_STORE
 
-def find_and_replace_wildcards(prompt, offset_seed, debug=False):
-    # wildcards use the __file_name__ syntax with optional |word_to_find
+
+# Regex pattern to match wildcards: optional (nnn$$) prefix, __(!/+/-/*)? for behavior indicator,
+# main capture group for wildcard name (can have _ within text), optional |word to filter by
+WILDCARD_REGEX = r'((\d+)\$\$)?__(!|\+|-|\*)?((?:[^|_]+_)*[^|_]+)((?:\|[^|]+)*)__'
+# Legacy regex pattern used as reference
+# r'(\[(\d+)\$\$)?__((?:[^|_]+_)*[^|_]+)((?:\|[^|]+)*)__\]?'
+RANDOM_REGEX = r'<random:(-?\d*\.?\d+):(-?\d*\.?\d+)>'
+
+# One scan finds both <random:a:b> tags and wildcards, in the order they appear
+_TEMPLATE_TOKEN_RE = re.compile(f'(?P<random>{RANDOM_REGEX})|(?P<wildcard>{WILDCARD_REGEX})')
+_TEMPLATE_CACHE_LIMIT = 4096
+# Wildcard lines are expanded again on the next pass; the first pass plus 10 more
+_MAX_WILDCARD_DEPTH = 10
+
+
+def get_wildcard_path():
+    # wildcards live in user/wildcards
     wildcard_path = os.path.join(folder_paths.get_user_directory(), 'wildcards')
     # backwards compatibility with pre paths update to comfy
     if not os.path.isdir(wildcard_path):
         wildcard_path = os.path.join(os.path.dirname(folder_paths.__file__), 'wildcards')
-    # Regex pattern to match wildcards: optional (nnn$$) prefix, __(!/+/-/*)? for behavior indicator,
-    # main capture group for wildcard name (can have _ within text), optional |word to filter by
-    wildcard_regex = r'((\d+)\$\$)?__(!|\+|-|\*)?((?:[^|_]+_)*[^|_]+)((?:\|[^|]+)*)__'
-    # Legacy regex pattern used as reference
-    # r'(\[(\d+)\$\$)?__((?:[^|_]+_)*[^|_]+)((?:\|[^|]+)*)__\]?'
-    match_strings = []
-    random.seed(offset_seed)
-    offset = offset_seed
-
-    new_prompt = ''
-    last_end = 0
+    return wildcard_path
 
-    for m in re.finditer(wildcard_regex, prompt):
-        full_match, lines_count_str, offset_type, actual_match, words_to_find_str = m.groups()
-        # Append everything up to this match
-        new_prompt += prompt[last_end:m.start()]
-
-        # lock indicator
-        lock_indicator = offset_type == '!'
-        # increment indicator
-        increment_indicator = offset_type == '+'
-        # decrement indicator
-        decrement_indicator = offset_type == '-'
-        # random indicator
-        random_indicator = offset_type == '*'
-
-        #for full_match, lines_count_str, actual_match, words_to_find_str in re.findall(wildcard_regex, prompt):
-        words_to_find = words_to_find_str.split('|')[1:] if words_to_find_str else None
-        if debug:
-            print(f'Wildcard match: {actual_match}')
-            print(f'Wildcard words to find: {words_to_find}')
-        lines_to_insert = int(lines_count_str) if lines_count_str else 1
-        if debug:
-            print(f'Wildcard lines to insert: {lines_to_insert}')
+
+class _RandomTag:
+    """<random:lower:upper>"""
+    __slots__ = ('source', 'lower', 'upper')
+
+    def __init__(self, source, lower, upper):
+        self.source = source
+        self.lower = lower
+        self.upper = upper
+
+
+class _WildcardRef:
+    """(nnn$$)__(!|+|-|*)name(|word...)__"""
+    __slots__ = ('source', 'lines_to_insert', 'offset_type', 'name', 'words_to_find', 'wildcard_dir', 'wildcard_file')
+
+    def __init__(self, source, lines_count_str, offset_type, actual_match, words_to_find_str):
+        self.source = source
+        self.lines_to_insert = int(lines_count_str) if lines_count_str else 1
+        self.offset_type = offset_type
+        self.name = actual_match
+        self.words_to_find = tuple(words_to_find_str.split('|')[1:]) if words_to_find_str else None
         match_parts = actual_match.split('/')
         if len(match_parts) > 1:
             # noinspection PyArgumentList
-            wildcard_dir = str(os.path.join(*match_parts[:-1]))
-            wildcard_file = str(match_parts[-1])
+            self.wildcard_dir = str(os.path.join(*match_parts[:-1]))
+            self.wildcard_file = str(match_parts[-1])
         else:
-            wildcard_dir = ''
-            wildcard_file = str(match_parts[0])
-        search_path = os.path.join(wildcard_path, wildcard_dir)
-        file_path = os.path.join(search_path, wildcard_file + '.txt')
-        if not os.path.isfile(file_path) and wildcard_dir == '':
-            file_path = os.path.join(wildcard_path, wildcard_file + '.txt')
-        if os.path.isfile(file_path):
-            store_offset = None
-            if actual_match in match_strings:
-                store_offset = offset
-                if lock_indicator:
-                    offset = offset_seed
-                elif random_indicator:
-                    offset = random.randint(0, 1000000)
-                elif increment_indicator:
-                    offset = offset_seed + 1
-                elif decrement_indicator:
-                    offset = offset_seed - 1
-                else:
-                    offset = random.randint(0, 1000000)
-            selected_lines = []
-            with open(file_path, 'r', encoding='utf-8') as file:
-                # filter out comment lines (starting with #) and empty lines
-                file_lines = [ln.strip() for ln in file.readlines() if ln.strip() and not ln.lstrip().startswith('#')]
-                num_lines = len(file_lines)
-
-                # Check if the file has no usable lines
-                if num_lines == 0:
-                    error_msg = f"[ERROR: file {wildcard_file}.txt is empty in {search_path}]"
-                    new_prompt += error_msg
-                    if debug:
-                        print(error_msg)
-                    last_end = m.end()
-                    continue
+            self.wildcard_dir = ''
+            self.wildcard_file = str(match_parts[0])
 
-                if words_to_find:
-                    for i in range(lines_to_insert):
-                        start_idx = (offset + i) % num_lines
-                        found_matching_line = False
-                        for j in range(num_lines):
-                            line_number = (start_idx + j) % num_lines
-                            line = file_lines[line_number]
-                            if any(re.search(r'\b' + re.escape(word) + r'\b', line, re.IGNORECASE) for word in words_to_find):
-                                selected_lines.append(line)
-                                found_matching_line = True
-                                break
-                        if not found_matching_line:
-                            # No matching line found for the filter words
-                            filter_words_str = ', '.join(words_to_find)
-                            error_msg = f"[ERROR: no lines matching filter words '{filter_words_str}' found in {wildcard_file}.txt]"
-                            selected_lines.append(error_msg)
-                else:
-                    start_idx = offset % num_lines
-                    for i in range(lines_to_insert):
-                        line_number = (start_idx + i) % num_lines
-                        line = file_lines[line_number]
-                        selected_lines.append(line)
-            if len(selected_lines) == 1:
-                replacement_text = selected_lines[0]
-            else:
-                replacement_text = ','.join(selected_lines)
-            new_prompt += replacement_text
-            match_strings.append(actual_match)
-            if store_offset is not None:
-                offset = store_offset
-                store_offset = None
-            offset += lines_to_insert
-            if debug:
-                print('Wildcard prompt selected: ' + replacement_text)
+
+class _WildcardPass:
+    """Line selection state shared by every wildcard expanded in one pass over a prompt."""
+    __slots__ = ('seed', 'offset', 'seen', 'rng')
+
+    def __init__(self, seed, rng):
+        self.seed = seed
+        self.offset = seed
+        self.seen = set()
+        self.rng = rng
+
+
+def _expand_wildcard(wc, state, wildcard_path, debug=False):
+    """Return the replacement text (selected line(s) or an error message) for one wildcard."""
+    if debug:
+        print(f'Wildcard match: {wc.name}')
+        print(f'Wildcard words to find: {list(wc.words_to_find) if wc.words_to_find else None}')
+        print(f'Wildcard lines to insert: {wc.lines_to_insert}')
+    search_path = os.path.join(wildcard_path, wc.wildcard_dir)
+    file_path = os.path.join(search_path, wc.wildcard_file + '.txt')
+    # comment lines (starting with #) and empty lines are already filtered out by the store
+    wildcard_entry = WILDCARD_STORE.get(file_path)
+    if wildcard_entry is None:
+        # File not found - generate error message
+        if wc.wildcard_dir:
+            error_msg = f"[ERROR: file not found {wc.wildcard_file}.txt in {search_path}]"
         else:
-            # File not found - generate error message
-            if wildcard_dir:
-                error_msg = f"[ERROR: file not found {wildcard_file}.txt in {search_path}]"
+            error_msg = f"[ERROR: file not found {wc.wildcard_file}.txt in {wildcard_path}]"
+        if debug:
+            print(error_msg)
+        return error_msg
+
+    offset = state.offset
+    store_offset = None
+    if wc.name in state.seen:
+        store_offset = offset
+        if wc.offset_type == '!':  # lock indicator
+            offset = state.seed
+        elif wc.offset_type == '*':  # random indicator
+            offset = state.rng.randint(0, 1000000)
+        elif wc.offset_type == '+':  # increment indicator
+            offset = state.seed + 1
+        elif wc.offset_type == '-':  # decrement indicator
+            offset = state.seed - 1
+        else:
+            offset = state.rng.randint(0, 1000000)
+
+    file_lines = wildcard_entry.lines
+    num_lines = len(file_lines)
+
+    # Check if the file has no usable lines
+    if num_lines == 0:
+        error_msg = f"[ERROR: file {wc.wildcard_file}.txt is empty in {search_path}]"
+        state.offset = offset
+        if debug:
+            print(error_msg)
+        return error_msg
+
+    selected_lines = []
+    if wc.words_to_find:
+        for i in range(wc.lines_to_insert):
+            start_idx = (offset + i) % num_lines
+            # whole-word, case-insensitive match against the file's word index
+            line_number = wildcard_entry.next_matching_line(start_idx, wc.words_to_find)
+            if line_number is not None:
+                selected_lines.append(file_lines[line_number])
             else:
-                error_msg = f"[ERROR: file not found {wildcard_file}.txt in {wildcard_path}]"
-            new_prompt += error_msg
-            if debug:
-                print(error_msg)
+                # No matching line found for the filter words
+                filter_words_str = ', '.join(wc.words_to_find)
+                error_msg = f"[ERROR: no lines matching filter words '{filter_words_str}' found in {wc.wildcard_file}.txt]"
+                selected_lines.append(error_msg)
+    else:
+        start_idx = offset % num_lines
+        for i in range(wc.lines_to_insert):
+            line_number = (start_idx + i) % num_lines
+            selected_lines.append(file_lines[line_number])
+    if len(selected_lines) == 1:
+        replacement_text = selected_lines[0]
+    else:
+        replacement_text = ','.join(selected_lines)
+    state.seen.add(wc.name)
+    if store_offset is not None:
+        offset = store_offset
+    state.offset = offset + wc.lines_to_insert
+    if debug:
+        print('Wildcard prompt selected: ' + replacement_text)
+    return replacement_text
+
+
+_template_cache = OrderedDict()
+_template_cache_lock = threading.Lock()
+
+
+def compile_template(text):
+    """
+    Split prompt text into literal strings, _RandomTag and _WildcardRef segments.
+    Results are cached by text, so a prompt (or wildcard line) is only tokenized once.
+    """
+    if '__' not in text and '<random:' not in text:
+        return (text,)
+    with _template_cache_lock:
+        segments = _template_cache.get(text)
+        if segments is not None:
+            _template_cache.move_to_end(text)
+            return segments
+
+    segments = []
+    last_end = 0
+    for m in _TEMPLATE_TOKEN_RE.finditer(text):
+        if m.start() > last_end:
+            segments.append(text[last_end:m.start()])
+        if m.group('random') is not None:
+            segments.append(_RandomTag(m.group(0), float(m.group(2)), float(m.group(3))))
+        else:
+            segments.append(_WildcardRef(m.group(0), m.group(6), m.group(7), m.group(8), m.group(9)))
         last_end = m.end()
-    new_prompt += prompt[last_end:]
-    return new_prompt
+    if last_end < len(text):
+        segments.append(text[last_end:])
+    segments = tuple(segments)
+
+    with _template_cache_lock:
+        _template_cache[text] = segments
+        if len(_template_cache) > _TEMPLATE_CACHE_LIMIT:
+            _template_cache.popitem(last=False)
+    return segments
+
+
+def find_and_replace_wildcards(prompt, offset_seed, debug=False, rng=None):
+    # wildcards use the __file_name__ syntax with optional |word_to_find
+    # (a single pass: wildcards inside the inserted lines are left as they are)
+    # `rng` defaults to a fresh random.Random(offset_seed); the global random state is never touched
+    wildcard_path = get_wildcard_path()
+    if rng is None:
+        rng = random.Random(offset_seed)
+    state = _WildcardPass(offset_seed, rng)
+    parts = []
+    for segment in compile_template(prompt):
+        if isinstance(segment, _WildcardRef):
+            parts.append(_expand_wildcard(segment, state, wildcard_path, debug))
+        elif isinstance(segment, _RandomTag):
+            parts.append(segment.source)
+        else:
+            parts.append(segment)
+    return ''.join(parts)
+
 
-def process_wildcard_syntax(text, seed):
-    # We keep braceexpand as the core expander, but enrich syntax pre-processing
-    # to support weighted choices and multi-select with quantifiers.
-    random.seed(seed)
+class _TemplateEvaluation:
+    """
+    Expands a prompt's wildcards, nested wildcards and <random:a:b> tags for one seed in a
+    single depth-first walk over compiled templates.
+
+    Text inserted by a wildcard is expanded one level deeper, and every level keeps its own
+    selection offset and random streams. A depth-first walk visits each level in document
+    order, so the result is the same as re-scanning the whole prompt once per level.
+    """
+
+    def __init__(self, seed, wildcard_path, substitute=None, debug=False):
+        self.seed = seed
+        self.wildcard_path = wildcard_path
+        self.substitute = substitute
+        self.debug = debug
+        self.passes = []
+        self.random_rngs = []
+
+    def _level(self, depth):
+        while len(self.passes) <= depth:
+            self.passes.append(_WildcardPass(self.seed, random.Random(self.seed)))
+            self.random_rngs.append(random.Random(self.seed))
+        return self.passes[depth], self.random_rngs[depth]
+
+    def run(self, text, depth, out):
+        if depth > _MAX_WILDCARD_DEPTH:
+            out.append(text)
+            return
+        if self.substitute is not None:
+            text = self.substitute(text)
+        for segment in compile_template(text):
+            if isinstance(segment, str):
+                out.append(segment)
+            elif isinstance(segment, _RandomTag):
+                rng = self._level(depth)[1]
+                out.append(str(round(rng.uniform(segment.lower, segment.upper), 4)))
+            else:
+                replacement = _expand_wildcard(segment, self._level(depth)[0], self.wildcard_path, self.debug)
+                self.run(replacement, depth + 1, out)
+
+
+def make_substitution(extra_pnginfo, prompt_):
+    """Return a memoized search_and_replace for one execution's workflow/prompt data."""
+    memo = {}
+    workflow_index = []
+
+    def substitute(text):
+        if '%' not in text:
+            return text
+        result = memo.get(text)
+        if result is None:
+            if not workflow_index:
+                # the workflow is indexed on first use, and only once
+                workflow_index.append(WorkflowIndex.build(extra_pnginfo, prompt_)
+                                      if extra_pnginfo is not None and prompt_ is not None else None)
+            if workflow_index[0] is None and '%date:' not in text:
+                result = text
+            else:
+                result = search_and_replace(text, extra_pnginfo, prompt_, workflow_index[0])
+            memo[text] = result
+        return result
+
+    return substitute
+
+
+def expand_wildcard_template(text, seed, substitute=None, wildcard_path=None, debug=False):
+    """
+    Expand %Node.widget%/%date:..% references (via `substitute`), <random:a:b> tags and
+    (nested) wildcards in `text` for `seed`. Brace syntax and comments are left untouched.
+    """
+    evaluation = _TemplateEvaluation(seed, wildcard_path or get_wildcard_path(), substitute, debug)
+    out = []
+    evaluation.run(text, 0, out)
+    return ''.join(out)
+
+def process_wildcard_syntax(text, seed, rng=None):
+    # Expansion follows braceexpand, enriched with weighted choices (N::option)
+    # and multi-select with quantifiers.
+    if rng is None:
+        rng = random.Random(seed)
 
     # Fast path
     if '{' not in text or '}' not in text:
@@ -192,21 +346,6 @@ def process_wildcard_syntax(text, seed):
         parts.append(s[last:])
         return parts
 
-    def rewrite_weighted(content: str) -> str:
-        parts = split_top_level_pipes(content)
-        changed = False
-        new_parts = []
-        for p in parts:
-            m = re.match(r"\s*(\d+)\s*::(.*)\Z", p, re.S)
-            if m:
-                count = int(m.group(1))
-                option = m.group(2)
-                new_parts.extend([option] * max(0, count))
-                changed = True
-            else:
-                new_parts.append(p)
-        return '|'.join(new_parts) if changed else content
-
     def process_multiselect(content: str):
         # pattern A: countSpec $$ sep $$ options
         # pattern B: countSpec $$ options (default separator = single space)
@@ -232,33 +371,37 @@ def process_wildcard_syntax(text, seed):
             hi = int(m_range.group(2))
             if hi < lo:
                 lo, hi = hi, lo
-            k = random.randint(lo, hi)
+            k = rng.randint(lo, hi)
         elif m_single:
             k = int(m_single.group(1))
         else:
             return None
 
-        # build options with quantifiers N#token
+        # build options with quantifiers N#token, kept as counts rather than N copies
         raw_opts = split_top_level_pipes(options_str)
         options = []
+        counts = []
         for opt in raw_opts:
             q = re.match(r"\s*(\d+)\s*#(.*)\Z", opt, re.S)
             if q:
-                n = int(q.group(1))
-                tok = q.group(2)
-                options.extend([tok] * max(0, n))
+                options.append(q.group(2))
+                counts.append(int(q.group(1)))
             else:
                 options.append(opt)
+                counts.append(1)
 
-        if not options:
+        total = sum(counts)
+        if not total:
             return ''
 
-        take = min(k, len(options))
-        # unique selection without replacement
-        chosen = random.sample(options, take) if take > 0 else []
+        take = min(k, total)
+        # unique selection without replacement; sampling with counts draws exactly as
+        # sampling the list with every token repeated N times would
+        chosen = rng.sample(options, take, counts=counts) if take > 0 else []
         return sep.join(chosen)
 
-    # Process innermost braces for custom syntaxes
+    # Process innermost braces for multi-select; weighted N::option choices are
+    # left in place and weighed by the brace sampler
     while True:
         stack = []
         pairs = []
@@ -277,135 +420,799 @@ def process_wildcard_syntax(text, seed):
             if repl is not None:
                 text = text[:start] + repl + text[end + 1:]
                 changed_any = True
-                continue
-            rewritten = rewrite_weighted(inner)
-            if rewritten != inner:
-                text = text[:start] + '{' + rewritten + '}' + text[end + 1:]
-                changed_any = True
         if not changed_any:
             break
 
-    # Now run braceexpand across the whole string using '|' as alternation
+    # Now pick one braceexpand expansion across the whole string using '|' as alternation
     inert_comma = '，'  # fullwidth comma as inert temporary character
     safe_text = text.replace(',', inert_comma).replace('|', ',')
-    expansions = list(braceexpand(safe_text))
-    expansions = [e.replace(inert_comma, ',') for e in expansions]
-    if not expansions:
+    expansion = sample_brace_expansion(safe_text, rng)
+    if expansion is None:
         return text
-    return random.choice(expansions)
+    return expansion.replace(inert_comma, ',')
 
-def search_and_replace(text, extra_pnginfo, prompt):
-    if extra_pnginfo is None or prompt is None:
-        return text
-    # if %date: in text, then replace with date
-    #print(text)
-    if '%date:' in text:
-        for match in re.finditer(r'%date:(.*?)%', text):
-            date_match = match.group(1)
-            cursor = 0
-            date_pattern = ''
-            now = datetime.datetime.now()
-
-            pattern_map = {
-                'yyyy': now.strftime('%Y'),
-                'yy': now.strftime('%y'),
-                'MM': now.strftime('%m'),
-                'M': now.strftime('%m').lstrip('0'),
-                'dd': now.strftime('%d'),
-                'd': now.strftime('%d').lstrip('0'),
-                'hh': now.strftime('%H'),
-                'h': now.strftime('%H').lstrip('0'),
-                'mm': now.strftime('%M'),
-                'm': now.strftime('%M').lstrip('0'),
-                'ss': now.strftime('%S'),
-                's': now.strftime('%S').lstrip('0')
-            }
-
-            sorted_keys = sorted(pattern_map.keys(), key=len, reverse=True)
-
-            while cursor < len(date_match):
-                replaced = False
-                for key in sorted_keys:
-                    if date_match.startswith(key, cursor):
-                        date_pattern += pattern_map[key]
-                        cursor += len(key)
-                        replaced = True
-                        break
-                if not replaced:
-                    date_pattern += date_match[cursor]
-                    cursor += 1
-
-            text = text.replace('%date:' + match.group(1) + '%', date_pattern)
-    # Parse JSON if they are strings
-    if isinstance(extra_pnginfo, str):
-        extra_pnginfo = json.loads(extra_pnginfo)
-    if isinstance(prompt, str):
-        prompt = json.loads(prompt)
-
-    # Map from "Node name for S&R" to id in the workflow
-    node_to_id_map = {}
-    try:
-        for node in extra_pnginfo['workflow']['nodes']:
-            node_name = node['properties'].get('Node name for S&R')
-            node_id = node['id']
-            node_to_id_map[node_name] = node_id
-    except:
-        return text
 
-    # Find all patterns in the text that need to be replaced
-    patterns = re.findall(r"%([^%]+)%", text)
-    for pattern in patterns:
-        # Split the pattern to get the node name and widget name
-        node_name, widget_name = pattern.split('.')
+# Brace expansion sampling.
+#
+# The grammar below mirrors braceexpand (ranges, nested sequences, backslash escapes and
+# its handling of unbalanced braces), but instead of enumerating the full product it
+# builds a tree that knows how many expansions each part has. The n-th expansion, in
+# braceexpand's own order, is then decoded directly, so picking one costs time linear in
+# the template length however many combinations it describes. Like braceexpand, every
+# (nested) product strips backslash escapes from its own expansion.
+#
+# Weighted options ({3::a|b}) are counted as if the option were repeated N times, without
+# repeating it: a sequence is only an alternation if its weights add up to at least 2.
 
-        # Find the id for this node name
-        node_id = node_to_id_map.get(node_name)
-        if node_id is None:
-            print(f"No node with name {node_name} found.")
-            # check if user entered id instead of node name
-            if node_name in node_to_id_map.values():
-                node_id = node_name
+_BRACE_INT_RANGE_RE = re.compile(r'^(-?\d+)\.\.(-?\d+)(?:\.\.-?(\d+))?$')
+_BRACE_CHAR_RANGE_RE = re.compile(r'^([A-Za-z])\.\.([A-Za-z])(?:\.\.-?(\d+))?$')
+_BRACE_ALPHABET = string.ascii_uppercase + string.ascii_lowercase
+_BRACE_ESCAPE_RE = re.compile(r'\\(.)')
+_BRACE_WEIGHT_RE = re.compile(r'\s*(\d+)\s*::(.*)\Z', re.S)
+
+
+class _BraceText:
+    __slots__ = ('text',)
+    count = 1
+
+    def __init__(self, text):
+        self.text = text
+
+    def expand(self, index):
+        return self.text
+
+
+class _BraceRange:
+    """{1..10}, {a..z} and friends; `values` is a range or a str."""
+    __slots__ = ('values', 'fmt', 'count')
+
+    def __init__(self, values, fmt=None):
+        self.values = values
+        self.fmt = fmt
+        self.count = len(values)
+
+    def expand(self, index):
+        value = self.values[index]
+        return self.fmt % value if self.fmt is not None else value
+
+
+class _BraceProduct:
+    """Concatenation of parts; the last part varies fastest, as with itertools.product."""
+    __slots__ = ('items', 'count')
+
+    def __init__(self, items):
+        self.items = items
+        count = 1
+        for item in items:
+            count *= item.count
+        self.count = count
+
+    def expand(self, index):
+        parts = []
+        for item in reversed(self.items):
+            index, sub = divmod(index, item.count)
+            parts.append(item.expand(sub))
+        parts.reverse()
+        text = ''.join(parts)
+        return _BRACE_ESCAPE_RE.sub(r'\1', text) if '\\' in text else text
+
+
+class _BraceChain:
+    """Alternatives of a {a,b,c} sequence, expanded one after another (each `weight` times)."""
+    __slots__ = ('options', 'offsets', 'count')
+
+    def __init__(self, options, weights=None):
+        self.options = options
+        offsets = []
+        total = 0
+        for k, option in enumerate(options):
+            offsets.append(total)
+            total += option.count * (weights[k] if weights is not None else 1)
+        self.offsets = offsets
+        self.count = total
+
+    def expand(self, index):
+        k = bisect_right(self.offsets, index) - 1
+        option = self.options[k]
+        return option.expand((index - self.offsets[k]) % option.count)
+
+
+def _parse_brace_pattern(pattern, ctx=None):
+    start = 0
+    pos = 0
+    depth = 0
+    items = []
+    while pos < len(pattern):
+        c = pattern[pos]
+        if c == '\\':
+            pos += 2
+            continue
+        elif c == '{':
+            if depth == 0 and pos > start:
+                items.extend(_brace_text(pattern[start:pos], ctx))
+                start = pos
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                expr = pattern[start + 1:pos]
+                item = None
+                if ctx is not None and '$$' in expr:
+                    item = ctx.multiselect(expr)
+                if item is None and '::' in expr:
+                    item, expr = _parse_weighted_sequence(expr, ctx)
+                if item is None:
+                    item = _parse_brace_expression(expr, ctx)
+                if item is None:  # not a range or sequence
+                    items.extend([_BraceText('{'), _parse_brace_pattern(expr, ctx), _BraceText('}')])
+                else:
+                    items.append(item)
+                start = pos + 1
+        pos += 1
+
+    if depth != 0:
+        raise UnbalancedBracesError("Unbalanced braces: '%s'" % pattern)
+    if start < pos:
+        items.extend(_brace_text(pattern[start:], ctx))
+    return _BraceProduct(items)
+
+
+def _brace_text(text, ctx):
+    return ctx.leaves(text) if ctx is not None else [_BraceText(text)]
+
+
+def _parse_brace_expression(expr, ctx=None):
+    m = _BRACE_INT_RANGE_RE.match(expr)
+    if m:
+        first, last, step = m.groups()
+        if any(s.startswith(('0', '-0')) for s in (first, last) if s not in ('0', '-0')):
+            padding = max(len(first), len(last))
+        else:
+            padding = 0
+        step = (int(step) or 1) if step else 1
+        first = int(first)
+        last = int(last)
+        values = range(first, last + 1, step) if first < last else range(first, last - 1, -step)
+        return _BraceRange(values, '%0{}d'.format(padding))
+
+    m = _BRACE_CHAR_RANGE_RE.match(expr)
+    if m:
+        first, last, step = m.groups()
+        step = (int(step) or 1) if step else 1
+        first = _BRACE_ALPHABET.index(first)
+        last = _BRACE_ALPHABET.index(last)
+        if first < last:
+            return _BraceRange(_BRACE_ALPHABET[first:last + 1:step])
+        last = last or -len(_BRACE_ALPHABET)
+        return _BraceRange(_BRACE_ALPHABET[first:last - 1:-step])
+
+    return _parse_brace_sequence(expr, ctx)
+
+
+def _split_brace_sequence(seq):
+    """Split on top-level commas; returns None for unbalanced braces."""
+    start = 0
+    pos = 0
+    depth = 0
+    parts = []
+    while pos < len(seq):
+        c = seq[pos]
+        if c == '\\':
+            pos += 2
+            continue
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            parts.append(seq[start:pos])
+            start = pos + 1
+        pos += 1
+    if depth != 0:
+        return None
+    parts.append(seq[start:])
+    return parts
+
+
+def _parse_weighted_sequence(expr, ctx=None):
+    """
+    Handle a brace expression with N::option weights. Returns (item, expr): a weighted
+    _BraceChain, or None with the expression as it reads once weights are applied.
+    When enumerating (`ctx` given), every option with a non-zero weight counts once.
+    """
+    parts = _split_brace_sequence(expr)
+    if parts is None:
+        return None, expr
+    options = []
+    weights = []
+    weighted = False
+    for part in parts:
+        m = _BRACE_WEIGHT_RE.match(part)
+        if m:
+            weighted = True
+            weight = int(m.group(1))
+            part = m.group(2)
+        else:
+            weight = 1
+        if weight > 0:
+            options.append(part)
+            weights.append(weight)
+    if not weighted:
+        return None, expr
+    if sum(weights) < 2:
+        # zero or one remaining option is not an alternation
+        return None, ','.join(options)
+    options = [_parse_brace_pattern(o, ctx) for o in options]
+    return _BraceChain(options, weights if ctx is None else None), expr
+
+
+def _parse_brace_sequence(seq, ctx=None):
+    start = 0
+    pos = 0
+    depth = 0
+    options = []
+    while pos < len(seq):
+        c = seq[pos]
+        if c == '\\':
+            pos += 2
+            continue
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            options.append(_parse_brace_pattern(seq[start:pos], ctx))
+            start = pos + 1
+        pos += 1
+
+    if depth != 0 or not options:  # unbalanced braces or not a sequence
+        return None
+    # part after the last comma (may be the empty string)
+    options.append(_parse_brace_pattern(seq[start:], ctx))
+    return _BraceChain(options)
+
+
+@lru_cache(maxsize=256)
+def parse_brace_pattern(pattern):
+    """Parse a braceexpand pattern (',' separated) into a tree that can count and decode expansions."""
+    return _parse_brace_pattern(pattern)
+
+
+def brace_expansion_at(tree, index):
+    """Return expansion number `index` of `tree`, in the order braceexpand would yield it."""
+    return tree.expand(index)
+
+
+def sample_brace_expansion(pattern, rng):
+    """
+    Equivalent to ``rng.choice(list(braceexpand(pattern)))`` without building the list:
+    both draw a single index below the number of expansions, so the same seed picks
+    the same expansion. Returns None if the pattern has no expansions.
+    """
+    tree = parse_brace_pattern(pattern)
+    if not tree.count:
+        return None
+    return brace_expansion_at(tree, rng.randrange(tree.count))
+
+# Exhaustive enumeration.
+#
+# Enumerate mode reuses the counted brace tree, extended with two more kinds of node: a
+# wildcard reference is an alternation over the (filtered) lines of its file, each line
+# itself parsed as a template, and a multi-select group is an alternation over every
+# combination of its options. The template is then a mixed-radix counter (a sum of
+# products where wildcard lines differ in shape), and expansion K is decoded directly,
+# so any page of an enormous space is produced in time and memory independent of K.
+
+_MULTISELECT_QUANTIFIER_RE = re.compile(r'\s*(\d+)\s*#(.*)\Z', re.S)
+_MULTISELECT_RANGE_RE = re.compile(r'\s*(\d+)\s*-\s*(\d+)\s*\Z')
+_MULTISELECT_COUNT_RE = re.compile(r'\s*(\d+)\s*\Z')
+# While braces are parsed, wildcards and random tags stand in the text as a number between two
+# copies of a private-use character that the text does not otherwise contain
+_PLACEHOLDER_FIRST = 0xE000
+_PLACEHOLDER_LAST = 0xF8FF
+_INERT_COMMA = '，'
+
+
+class _BraceConcat(_BraceProduct):
+    """A product whose backslash escapes are left to the product it is part of."""
+    __slots__ = ()
+
+    def expand(self, index):
+        parts = []
+        for item in reversed(self.items):
+            index, sub = divmod(index, item.count)
+            parts.append(item.expand(sub))
+        parts.reverse()
+        return ''.join(parts)
+
+
+class _BraceRandomValue:
+    """A <random:a:b> tag: its value is drawn per expansion by _PromptEnumeration.draw()."""
+    __slots__ = ('values', 'slot')
+    count = 1
+
+    def __init__(self, values, slot):
+        self.values = values
+        self.slot = slot
+
+    def expand(self, index):
+        return self.values[self.slot]
+
+
+def _placeholder_marker(text):
+    """A private-use character that does not occur in `text`."""
+    for code in range(_PLACEHOLDER_FIRST, _PLACEHOLDER_LAST + 1):
+        marker = chr(code)
+        if marker not in text:
+            return marker
+    raise ValueError("prompt uses every private-use character; cannot mark its wildcards")
+
+
+class _BraceLines:
+    """Wildcard lines with no syntax of their own; option i is lines i..i+n-1 (wrapping)."""
+    __slots__ = ('lines', 'line_ids', 'lines_to_insert', 'count')
+
+    def __init__(self, lines, line_ids, lines_to_insert):
+        self.lines = lines
+        self.line_ids = line_ids
+        self.lines_to_insert = lines_to_insert
+        self.count = len(line_ids)
+
+    def expand(self, index):
+        picked = [self.lines[self.line_ids[(index + i) % self.count]] for i in range(self.lines_to_insert)]
+        return ','.join(picked).replace(',', _INERT_COMMA).replace('|', ',')
+
+
+class _BraceCombination:
+    """
+    {k$$sep$$a|b|c}: every selection of k options (for each allowed k), in lexicographic
+    order of the options picked; nested option expansions vary fastest.
+    """
+    __slots__ = ('options', 'sizes', 'sep', 'suffix', 'count')
+
+    def __init__(self, options, sizes, sep):
+        self.options = options
+        self.sizes = sizes
+        self.sep = sep
+        top = max(sizes)
+        # suffix[i][j]: expansions of choosing j of options[i:]
+        suffix = [[1] + [0] * top for _ in range(len(options) + 1)]
+        for i in range(len(options) - 1, -1, -1):
+            n = options[i].count
+            for j in range(1, top + 1):
+                suffix[i][j] = suffix[i + 1][j] + n * suffix[i + 1][j - 1]
+        self.suffix = suffix
+        self.count = sum(suffix[0][k] for k in sizes)
+
+    def expand(self, index):
+        for k in self.sizes:
+            if index < self.suffix[0][k]:
+                break
+            index -= self.suffix[0][k]
+        picked = []
+        i = 0
+        while k:
+            option = self.options[i]
+            block = option.count * self.suffix[i + 1][k - 1]
+            if index < block:
+                sub, index = divmod(index, self.suffix[i + 1][k - 1])
+                picked.append(option.expand(sub))
+                k -= 1
             else:
+                index -= block
+            i += 1
+        return self.sep.join(picked)
+
+
+class _PromptEnumeration:
+    """
+    Builds the counted tree of every expansion of a prompt: %Node.widget% references,
+    (nested) wildcards, brace syntax, weighted options and multi-select groups.
+
+    Each wildcard reference varies independently of the others, weights only matter for
+    sampling (each option is listed once), and multi-select groups list every distinct
+    set of options, ignoring N# quantifiers. <random:a:b> tags are not enumerable: call
+    draw() with a seed before expanding to give them the values that seed draws.
+    """
+
+    def __init__(self, wildcard_path, substitute=None):
+        self.wildcard_path = wildcard_path
+        self.substitute = substitute
+        self.random_tags = []
+        self.random_values = []
+        self.placeholders = []
+        self.placeholder_re = None
+        self.wildcards = {}
+
+    def parse(self, text, depth=0):
+        """Tree of `text` at wildcard nesting `depth`, with ',' standing for '|'."""
+        self.placeholder_re = None
+        if depth <= _MAX_WILDCARD_DEPTH:
+            if self.substitute is not None:
+                text = self.substitute(text)
+            segments = compile_template(text)
+            marker = _placeholder_marker(''.join(s for s in segments if isinstance(s, str)))
+            parts = []
+            for segment in segments:
+                if isinstance(segment, str):
+                    parts.append(segment)
+                    continue
+                if isinstance(segment, _RandomTag):
+                    self.random_tags.append((depth, segment.lower, segment.upper))
+                    self.random_values.append('')
+                    node = _BraceRandomValue(self.random_values, len(self.random_tags) - 1)
+                else:
+                    node = self.wildcard(segment, depth)
+                parts.append(f'{marker}{len(self.placeholders)}{marker}')
+                self.placeholders.append(node)
+            text = ''.join(parts)
+            # Set after the loop: the wildcards above parse their lines with their own markers
+            self.placeholder_re = re.compile(f'{marker}(\\d+){marker}')
+        text = strip_all_comments(text)
+        return _parse_brace_pattern(text.replace(',', _INERT_COMMA).replace('|', ','), self)
+
+    def leaves(self, text):
+        """Literal text, with the wildcards and random tags swapped out of it put back as nodes."""
+        if self.placeholder_re is None:
+            return [_BraceText(text)]
+        items = []
+        last = 0
+        for m in self.placeholder_re.finditer(text):
+            if m.start() > last:
+                items.append(_BraceText(text[last:m.start()]))
+            items.append(self.placeholders[int(m.group(1))])
+            last = m.end()
+        if last < len(text) or not items:
+            items.append(_BraceText(text[last:]))
+        return items
+
+    def draw(self, seed):
+        """Give the <random:a:b> tags the values expand_prompt() would draw for `seed`."""
+        rngs = {}
+        for slot, (depth, lower, upper) in enumerate(self.random_tags):
+            rng = rngs.get(depth)
+            if rng is None:
+                rng = rngs[depth] = random.Random(seed)
+            self.random_values[slot] = str(round(rng.uniform(lower, upper), 4))
+
+    def wildcard(self, wc, depth):
+        search_path = os.path.join(self.wildcard_path, wc.wildcard_dir)
+        entry = WILDCARD_STORE.get(os.path.join(search_path, wc.wildcard_file + '.txt'))
+        if entry is None:
+            where = search_path if wc.wildcard_dir else self.wildcard_path
+            return _BraceText(f"[ERROR: file not found {wc.wildcard_file}.txt in {where}]")
+        if not len(entry.lines):
+            return _BraceText(f"[ERROR: file {wc.wildcard_file}.txt is empty in {search_path}]")
+        if wc.words_to_find:
+            line_ids = entry.matching_line_ids(wc.words_to_find)
+            if not line_ids:
+                filter_words_str = ', '.join(wc.words_to_find)
+                return _BraceText(f"[ERROR: no lines matching filter words '{filter_words_str}' found in {wc.wildcard_file}.txt]")
+        else:
+            line_ids = range(len(entry.lines))
+
+        key = (entry, wc.words_to_find, wc.lines_to_insert, depth)
+        node = self.wildcards.get(key)
+        if node is not None:
+            return node
+        if not entry.has_nested_syntax:
+            node = _BraceLines(entry.lines, line_ids, wc.lines_to_insert)
+        else:
+            line_trees = {i: self.parse(entry.lines[i], depth + 1).items for i in line_ids}
+            options = []
+            for pos in range(len(line_ids)):
+                items = []
+                for i in range(wc.lines_to_insert):
+                    if i:
+                        items.append(_BraceText(','))
+                    items.extend(line_trees[line_ids[(pos + i) % len(line_ids)]])
+                options.append(_BraceConcat(items))
+            node = _BraceChain(options)
+        self.wildcards[key] = node
+        return node
+
+    def multiselect(self, expr):
+        """Node for a {k$$sep$$a|b} or {k$$a|b} group, or None if `expr` is not one."""
+        parts = []
+        start = 0
+        depth = 0
+        pos = 0
+        while pos < len(expr):
+            c = expr[pos]
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth = max(0, depth - 1)
+            elif depth == 0 and expr.startswith('$$', pos):
+                parts.append(expr[start:pos])
+                pos += 2
+                start = pos
                 continue
+            pos += 1
+        parts.append(expr[start:])
+        if len(parts) < 2:
+            return None
+        if len(parts) >= 3:
+            sep = parts[1]
+            options_str = '$$'.join(parts[2:])
+        else:
+            sep = ' '
+            options_str = parts[1]
+        m_range = _MULTISELECT_RANGE_RE.match(parts[0])
+        m_single = _MULTISELECT_COUNT_RE.match(parts[0])
+        if m_range:
+            lo, hi = sorted((int(m_range.group(1)), int(m_range.group(2))))
+        elif m_single:
+            lo = hi = int(m_single.group(1))
+        else:
+            return None
+
+        options = []
+        for opt in _split_brace_sequence(options_str) or [options_str]:
+            q = _MULTISELECT_QUANTIFIER_RE.match(opt)
+            if q:
+                if not int(q.group(1)):
+                    continue
+                opt = q.group(2)
+            options.append(_parse_brace_pattern(opt, self))
+        if not options:
+            return _BraceText('')
+        sizes = list(range(min(lo, len(options)), min(hi, len(options)) + 1))
+        return _BraceCombination(options, sizes, sep)
+
+
+class IndexPermutation:
+    """
+    A seeded pseudo-random permutation of range(count), computed one index at a time.
+
+    A balanced Feistel network over the smallest even number of bits covering `count` is
+    a permutation of that power of two; indexes that land outside range(count) are fed
+    through again (cycle walking) until they land inside, which keeps it a permutation of
+    range(count). Nothing is stored, so any position of any size of space costs the same.
+    """
+    ROUNDS = 6
+
+    def __init__(self, count, seed=0):
+        self.count = count
+        bits = max(2, (count - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.key = str(seed).encode()[:64]
+
+    def _round(self, i, value):
+        need = (self.half_bits + 7) // 8
+        out = b''
+        block = 0
+        while len(out) < need:
+            out += hashlib.blake2b(f'{i}:{block}:{value}'.encode(), key=self.key).digest()
+            block += 1
+        return int.from_bytes(out[:need], 'little') & self.mask
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.mask
+        for i in range(self.ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index):
+        value = index
+        while True:
+            value = self._encrypt(value)
+            if value < self.count:
+                return value
+
+
+def enumerate_prompt(prompt, start, count, substitute=None, wildcard_path=None, shuffle_seed=None):
+    """
+    Return (expansions number start .. start+count-1 of `prompt`, total number of
+    expansions). Numbers wrap around modulo the total, so a cursor can run forever.
+    With `shuffle_seed`, the expansions are visited in the order of an IndexPermutation
+    instead, so every expansion still comes up exactly once per cycle.
+
+    <random:a:b> tags take the values drawn with each expansion's number (modulo the
+    total) as the seed, so an expansion reads the same however the walk is paged.
+    """
+    enumeration = _PromptEnumeration(wildcard_path or get_wildcard_path(), substitute)
+    tree = enumeration.parse(prompt)
+    total = tree.count
+    if not total:
+        return [], 0
+    order = IndexPermutation(total, shuffle_seed) if shuffle_seed is not None else range(total)
+    prompts = []
+    for index in range(start, start + count):
+        if enumeration.random_tags:
+            enumeration.draw(index % total)
+        prompts.append(tree.expand(order[index % total]).replace(_INERT_COMMA, ','))
+    return prompts, total
+
+
+_DATE_REFERENCE_RE = re.compile(r'%date:(.*?)%')
+# %Node.widget%: exactly one '.', so stray percent signs ("50% off") are left alone
+_WIDGET_REFERENCE_RE = re.compile(r'%([^%.]+)\.([^%.]+)%')
+# (token, strftime directive, strip leading zeros), longest tokens first
+_DATE_TOKENS = (
+    ('yyyy', '%Y', False), ('yy', '%y', False),
+    ('MM', '%m', False), ('dd', '%d', False), ('hh', '%H', False), ('mm', '%M', False), ('ss', '%S', False),
+    ('M', '%m', True), ('d', '%d', True), ('h', '%H', True), ('m', '%M', True), ('s', '%S', True),
+)
+
+
+@lru_cache(maxsize=256)
+def compile_date_format(date_format):
+    """Split a %date:...% format (yyyy, MM, dd, hh, mm, ss, ...) into literals and strftime fields."""
+    parts = []
+    cursor = 0
+    while cursor < len(date_format):
+        for token, directive, strip in _DATE_TOKENS:
+            if date_format.startswith(token, cursor):
+                parts.append((directive, strip))
+                cursor += len(token)
+                break
+        else:
+            parts.append((date_format[cursor], None))
+            cursor += 1
+    return tuple(parts)
+
+
+def format_date(date_format, now):
+    out = []
+    for value, strip in compile_date_format(date_format):
+        if strip is None:
+            out.append(value)
+        else:
+            field = now.strftime(value)
+            out.append(field.lstrip('0') if strip else field)
+    return ''.join(out)
+
+
+class WorkflowIndex:
+    """
+    Lookup of workflow nodes for %Node.widget% references, built once per prompt.
+
+    A node is found by its "Node name for S&R" property, then its title, then its id and
+    finally its type; widget values are read from the prompt's inputs for that node.
+    """
+
+    def __init__(self, prompt, by_name, by_title, by_id, by_type):
+        self.prompt = prompt
+        self.lookups = (by_name, by_title, by_id, by_type)
+
+    @classmethod
+    def build(cls, extra_pnginfo, prompt):
+        """Index the workflow in `extra_pnginfo`, or return None if it has none."""
+        # Parse JSON if they are strings
+        if isinstance(extra_pnginfo, str):
+            extra_pnginfo = json.loads(extra_pnginfo)
+        if isinstance(prompt, str):
+            prompt = json.loads(prompt)
+        by_name, by_title, by_id, by_type = {}, {}, {}, {}
+        try:
+            for node in extra_pnginfo['workflow']['nodes']:
+                node_id = node['id']
+                by_name[node['properties'].get('Node name for S&R')] = node_id
+                if node.get('title'):
+                    by_title[node['title']] = node_id
+                by_id[str(node_id)] = node_id
+                if node.get('type'):
+                    by_type[node['type']] = node_id
+        except (KeyError, TypeError, AttributeError):
+            return None
+        return cls(prompt, by_name, by_title, by_id, by_type)
 
+    def find_node(self, node_name):
+        for lookup in self.lookups:
+            node_id = lookup.get(node_name)
+            if node_id is not None:
+                return node_id
+        return None
+
+    def widget_value(self, node_name, widget_name):
+        """The value of a node's widget, or None (with a message) if it cannot be found."""
+        node_id = self.find_node(node_name)
+        if node_id is None:
+            print(f"No node with name {node_name} found.")
+            return None
         # Find the value of the specified widget in prompt JSON
-        prompt_node = prompt.get(str(node_id))
+        prompt_node = self.prompt.get(str(node_id))
         if prompt_node is None:
             print(f"No prompt data for node with id {node_id}.")
-            continue
-
+            return None
         widget_value = prompt_node['inputs'].get(widget_name)
         if widget_value is None:
             print(f"No widget with name {widget_name} found for node {node_name}.")
-            continue
+        return widget_value
 
-        # Replace the pattern in the text
-        text = text.replace(f"%{pattern}%", str(widget_value))
+    def replace(self, match):
+        widget_value = self.widget_value(match.group(1), match.group(2))
+        return match.group(0) if widget_value is None else str(widget_value)
+
+
+def search_and_replace(text, extra_pnginfo, prompt, workflow_index=None):
+    """
+    Replace %date:format% and %Node.widget% references in `text`. Pass a WorkflowIndex
+    built once for the prompt when calling this repeatedly.
+    """
+    if extra_pnginfo is None or prompt is None:
+        return text
+    if '%date:' in text:
+        now = datetime.datetime.now()
+        text = _DATE_REFERENCE_RE.sub(lambda m: format_date(m.group(1), now), text)
+    if '%' not in text:
+        return text
+    if workflow_index is None:
+        workflow_index = WorkflowIndex.build(extra_pnginfo, prompt)
+        if workflow_index is None:
+            return text
+    return _WIDGET_REFERENCE_RE.sub(workflow_index.replace, text)
+
+def _strip_hash_lines(text):
+    """
+    re.sub(r'(?m)^\s*#.*$', '', text) without trying the pattern at every position:
+    only '#' characters are visited, and a comment line is removed from the first line
+    start behind it that only whitespace (blank lines included) separates it from.
+    """
+    parts = []
+    copied = 0
+    search = 0
+    while True:
+        h = text.find('#', search)
+        if h < 0:
+            break
+        search = h + 1
+        j = h
+        while j > copied and text[j - 1].isspace():
+            j -= 1
+        if j == 0 or text[j - 1] == '\n':
+            line_start = j
+        else:
+            line_start = text.find('\n', j, h) + 1
+            if not line_start:
+                continue
+        line_end = text.find('\n', h)
+        if line_end < 0:
+            line_end = len(text)
+        parts.append(text[copied:line_start])
+        copied = search = line_end
+    if not parts:
+        return text
+    parts.append(text[copied:])
+    return ''.join(parts)
 
-    return text
 
 def strip_all_comments(text):
     # Remove HTML-style comments
-    text = re.sub(r'(?s)<!--.*?-->', '', text)
+    if '<' in text and '<!--' in text:
+        text = re.sub(r'(?s)<!--.*?-->', '', text)
     # Remove full lines starting with # (comments), respecting indentation
-    text = re.sub(r'(?m)^\s*#.*$', '', text)
+    if '#' in text:
+        text = _strip_hash_lines(text)
     return text
 
+
 def strip_all_syntax(text):
-    # replace any <lora:lora_name> with nothing
-    text = re.sub(r'<lora:(.*?)>', '', text)
-    # replace any <lora:lora_name:multiplier> with nothing
-    text = re.sub(r'<lora:(.*?):(.*?)>', '', text)
-    # replace any <style:style_name> with nothing
-    text = re.sub(r'<style:(.*?)>', '', text)
-    # replace any __wildcard_name__ with nothing
-    text = re.sub(r'__(.*?)__', '', text)
-    # replace any __wildcard_name|word__ with nothing
-    text = re.sub(r'__(.*?)\|(.*?)__', '', text)
-    # replace any [2$__wildcard__] with nothing
-    text = re.sub(r'\[\d+\$(.*?)\]', '', text)
-    # replace any [2$__wildcard|word__] with nothing
-    text = re.sub(r'\[\d+\$(.*?)\|(.*?)\]', '', text)
+    # Each step only runs if its marker is in the text at all; a single character is
+    # looked for first, which is much quicker to rule out than a longer marker
+    has_tag = '<' in text
+    if has_tag and '<lora:' in text:
+        # replace any <lora:lora_name> with nothing
+        text = re.sub(r'<lora:(.*?)>', '', text)
+        # replace any <lora:lora_name:multiplier> with nothing
+        text = re.sub(r'<lora:(.*?):(.*?)>', '', text)
+    if has_tag and '<style:' in text:
+        # replace any <style:style_name> with nothing
+        text = re.sub(r'<style:(.*?)>', '', text)
+    if '_' in text and '__' in text:
+        # replace any __wildcard_name__ with nothing
+        text = re.sub(r'__(.*?)__', '', text)
+        # replace any __wildcard_name|word__ with nothing
+        if '__' in text and '|' in text:
+            text = re.sub(r'__(.*?)\|(.*?)__', '', text)
+    if '[' in text:
+        # replace any [2$__wildcard__] with nothing
+        text = re.sub(r'\[\d+\$(.*?)\]', '', text)
+        # replace any [2$__wildcard|word__] with nothing
+        if '[' in text and '|' in text:
+            text = re.sub(r'\[\d+\$(.*?)\|(.*?)\]', '', text)
     # replace double spaces with single spaces
     text = text.replace('  ', ' ')
     # replace double commas with single commas
@@ -415,14 +1222,16 @@ def strip_all_syntax(text):
     # replace leading and trailing spaces and commas
     text = text.strip(' ,')
     # clean up any < > [ ] or _ that are left over
-    text = text.replace('<', '').replace('>', '').replace('[', '').replace(']', '').replace('_', '')
+    for leftover in '<>[]_':
+        if leftover in text:
+            text = text.replace(leftover, '')
     return text
 
-def process_random_syntax(text, seed):
+def process_random_syntax(text, seed, rng=None):
     #print('checking for random syntax')
-    random.seed(seed)
-    random_re = r'<random:(-?\d*\.?\d+):(-?\d*\.?\d+)>'
-    matches = re.finditer(random_re, text)
+    if rng is None:
+        rng = random.Random(seed)
+    matches = re.finditer(RANDOM_REGEX, text)
 
     # Create a list to hold the new segments of text
     new_text_list = []
@@ -431,7 +1240,7 @@ def process_random_syntax(text, seed):
     # Iterate through matches
     for match in matches:
         lower_bound, upper_bound = map(float, match.groups())
-        random_value = random.uniform(lower_bound, upper_bound)
+        random_value = rng.uniform(lower_bound, upper_bound)
         random_value = round(random_value, 4)
 
         # Append text up to the match and the generated number
@@ -450,6 +1259,21 @@ def process_random_syntax(text, seed):
     #print(new_text)
     return new_text
 
+def expand_prompt(prompt, seed, substitute=None):
+    """
+    Full expansion of an (already comment-stripped) prompt for one seed: references,
+    random tags and wildcards, then comments and brace syntax in the result.
+    """
+    new_prompt = expand_wildcard_template(prompt, seed, substitute)
+    new_prompt = strip_all_comments(new_prompt)
+    try:
+        new_prompt = process_wildcard_syntax(new_prompt, seed)
+    except UnbalancedBracesError as e:
+        error = f"[ERROR: unbalanced braces in prompt: {e}]"
+        new_prompt = error
+        print("[ovum-wildcard-processor] {}".format(error))
+    return new_prompt
+
 def add_metadata_to_dict(info_dict, **kwargs):
     for key, value in kwargs.items():
         if isinstance(value, (int, float, str)):
@@ -458,6 +1282,31 @@ def add_metadata_to_dict(info_dict, **kwargs):
             else:
                 info_dict[key].append(value)
                 
+_MODE_INPUT = (
+    ["random", "enumerate", "unique"],
+    {"default": "random",
+     "tooltip": "random: the seed picks one expansion at random. enumerate: the seed is an index into "
+                "every combination of the prompt's braces and wildcard lines, in order. unique: as "
+                "enumerate, but in an order shuffled by shuffle_seed, so consecutive seeds never repeat "
+                "a prompt until every combination has been used."}
+)
+_SHUFFLE_SEED_INPUT = (
+    "INT",
+    {"default": 0, "min": 0, "max": 0xFFFFFFFFFFFFFFFF,
+     "tooltip": "Seed of the shuffled order used by unique mode; keep it fixed while paging through."}
+)
+
+
+def enumerate_prompts(prompt, start, count, substitute=None, shuffle_seed=None):
+    """enumerate_prompt() for a node; an unbalanced prompt yields one error string."""
+    try:
+        return enumerate_prompt(prompt, start, count, substitute, shuffle_seed=shuffle_seed)
+    except UnbalancedBracesError as e:
+        error = f"[ERROR: unbalanced braces in prompt: {e}]"
+        print("[ovum-wildcard-processor] {}".format(error))
+        return [error] * count, 0
+
+
 class OvumWildcardProcessor:
     NAME = "Escapable Wildcard Processor 🥚"
     RETURN_TYPES = ("STRING",)
@@ -477,38 +1326,99 @@ class OvumWildcardProcessor:
                     {"default": 0, "min": 0, "max": 0xFFFFFFFFFFFFFFFF}
                 ),
             },
+            "optional": {
+                "mode": _MODE_INPUT,
+                "shuffle_seed": _SHUFFLE_SEED_INPUT,
+            },
             "hidden": {"prompt_": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
         }
 
-    def process(self, prompt, seed, prompt_=None, extra_pnginfo=None):
+    def process(self, prompt, seed, prompt_=None, extra_pnginfo=None, mode="random", shuffle_seed=0):
         if prompt_ is None:
             prompt_ = {}
         if extra_pnginfo is None:
             extra_pnginfo = {}
         # Strip comment lines before any processing so they are ignored everywhere
         prompt = strip_all_comments(prompt)
-        prompt = search_and_replace(prompt, extra_pnginfo, prompt_)
-        # prompt = process_wildcard_syntax(prompt, seed)
-        prompt = process_random_syntax(prompt, seed)
-        new_prompt = find_and_replace_wildcards(prompt, seed)
-        # loop to pick up wildcards that are in wildcard files
-        if new_prompt != prompt:
-            for i in range(10):
-                prompt = new_prompt
-                prompt = search_and_replace(prompt, extra_pnginfo, prompt_)
-                # prompt = process_wildcard_syntax(prompt, seed)
-                prompt = process_random_syntax(prompt, seed)
-                new_prompt = find_and_replace_wildcards(prompt, seed)
-                if new_prompt == prompt:
-                    break
-        new_prompt = strip_all_comments(new_prompt)
-        try:
-            new_prompt = process_wildcard_syntax(new_prompt, seed)
-        except UnbalancedBracesError as e:
-            error = f"[ERROR: unbalanced braces in prompt: {e}]"
-            new_prompt = error
-            print("[ovum-wildcard-processor] {}".format(error))
+        substitute = make_substitution(extra_pnginfo, prompt_)
+        if mode in ("enumerate", "unique"):
+            shuffle = shuffle_seed if mode == "unique" else None
+            prompts, _total = enumerate_prompts(prompt, seed, 1, substitute, shuffle)
+            return (prompts[0] if prompts else '', )
+        new_prompt = expand_prompt(prompt, seed, substitute)
         return (new_prompt, )
 
 
-CLAZZES = [OvumWildcardProcessor]
+class OvumWildcardBatchProcessor:
+    NAME = "Escapable Wildcard Processor (Batch) 🥚"
+    DESCRIPTION = """Expands the prompt once for each of `count` consecutive seeds starting at `seed_start`,
+giving the same prompts as the Escapable Wildcard Processor run with each seed. The
+parsed prompt and wildcard files are shared by every seed in the batch.
+
+In enumerate mode `seed_start` is instead the index of the first combination to output;
+feed `next_start` back into it to page through every combination, `total` of them.
+<random:a:b> tags are drawn with each combination's index as the seed, so a page gives the
+same prompts as the single node run with those indexes, however the walk is paged.
+Unique mode does the same in an order shuffled by `shuffle_seed`: a batch of N prompts is
+N distinct combinations (as long as N <= total) without any retrying or deduplication."""
+    RETURN_TYPES = ("STRING", "INT", "INT")
+    RETURN_NAMES = ("prompts", "next_start", "total")
+    OUTPUT_IS_LIST = (True, False, False)
+    FUNCTION = "process"
+    CATEGORY = "ovum/text"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "prompt": (
+                    "STRING",
+                    {"multiline": True, "placeholder": "Prompt Text"}
+                ),
+                "seed_start": (
+                    "INT",
+                    {"default": 0, "min": 0, "max": 0xFFFFFFFFFFFFFFFF}
+                ),
+                "count": (
+                    "INT",
+                    {"default": 10, "min": 1, "max": 100000}
+                ),
+            },
+            "optional": {
+                "mode": _MODE_INPUT,
+                "shuffle_seed": _SHUFFLE_SEED_INPUT,
+            },
+            "hidden": {"prompt_": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
+        }
+
+    def process(self, prompt, seed_start, count, prompt_=None, extra_pnginfo=None, mode="random", shuffle_seed=0):
+        if prompt_ is None:
+            prompt_ = {}
+        if extra_pnginfo is None:
+            extra_pnginfo = {}
+        prompt = strip_all_comments(prompt)
+        substitute = make_substitution(extra_pnginfo, prompt_)
+        if mode in ("enumerate", "unique"):
+            shuffle = shuffle_seed if mode == "unique" else None
+            prompts, total = enumerate_prompts(prompt, seed_start, count, substitute, shuffle)
+            next_start = (seed_start + count) % total if total else 0
+            return (prompts, next_start, total)
+        prompts = [expand_prompt(prompt, seed, substitute) for seed in range(seed_start, seed_start + count)]
+        return (prompts, seed_start + count, 0)
+
+
+CLAZZES = [OvumWildcardProcessor, OvumWildcardBatchProcessor]
+
+
+def start_wildcard_preloader(interval=5.0):
+    """Keep every wildcard file parsed in the background, re-checking every `interval` seconds."""
+    WILDCARD_PRELOADER.start(get_wildcard_path, interval)
+
+
+# Set OVUM_WILDCARD_PRELOAD to a poll interval in seconds to turn the preloader on
+_preload_interval = os.environ.get('OVUM_WILDCARD_PRELOAD', '').strip()
+if _preload_interval:
+    try:
+        start_wildcard_preloader(max(0.5, float(_preload_interval)))
+    except ValueError:
+        print(f"[ovum-wildcard-processor] ignoring OVUM_WILDCARD_PRELOAD={_preload_interval!r}: not a number of seconds")
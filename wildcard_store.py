@@ -0,0 +1,446 @@
+import os
+import re
+import stat
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Filter words made only of ASCII word characters can be answered from the token index:
+# for an ASCII line, r'\bword\b' (IGNORECASE) matches exactly when word.lower() is one of
+# the line's maximal \w runs, lower-cased.
+_ASCII_WORD_RE = re.compile(r'[A-Za-z0-9_]+\Z')
+_TOKEN_RE = re.compile(r'\w+')
+_FILTER_CACHE_LIMIT = 256
+# Wildcard lines containing none of these expand to themselves
+_NESTED_SYNTAX = ('{', '}', '\\', '__', '<random:', '%', '<!--')
+
+# Files at least this large are not read into memory. Instead the byte offset of every
+# usable line is kept in a sidecar file, <dir>/.index/<name>.txt.idx, and a pick seeks
+# to and reads just the line it needs.
+LARGE_FILE_BYTES = 4 * 1024 * 1024
+_INDEX_DIR = '.index'
+# magic, version, source mtime_ns, source size, line count, whether any line has nested
+# syntax; then one uint64 offset per line
+_INDEX_HEADER = struct.Struct('<4sIqqq?')
+_INDEX_MAGIC = b'OVWI'
+_INDEX_VERSION = 3
+_OFFSET = struct.Struct('<Q')
+_READ_BLOCK = 1024 * 1024
+
+
+def read_wildcard_lines(file_path: str) -> Tuple[str, ...]:
+    """Read a wildcard file, dropping blank lines and lines starting with '#'."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return tuple(ln.strip() for ln in file.readlines() if ln.strip() and not ln.lstrip().startswith('#'))
+
+
+def _iter_raw_lines(file, block_size: int = _READ_BLOCK) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (offset, line without its break) for the rest of a binary file. Lines break on
+    '\\n', '\\r\\n' and a lone '\\r', as with the universal newlines of read_wildcard_lines.
+    """
+    pos = file.tell()
+    buf = b''
+    while True:
+        block = file.read(block_size)
+        lines = (buf + block).splitlines(True)
+        # The last piece may be cut short, or be a '\r' whose '\n' starts the next block
+        buf = lines.pop() if block and lines else b''
+        for raw in lines:
+            yield pos, raw.rstrip(b'\r\n')
+            pos += len(raw)
+        if not block:
+            return
+
+
+def _iter_line_offsets(file_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (byte offset, line) for every line read_wildcard_lines would keep."""
+    with open(file_path, 'rb') as file:
+        for pos, raw in _iter_raw_lines(file):
+            line = raw.decode('utf-8').strip()
+            if line and not line.startswith('#'):
+                yield pos, line
+
+
+def _has_nested_syntax(line: str) -> bool:
+    return any(token in line for token in _NESTED_SYNTAX)
+
+
+def _index_path(file_path: str) -> str:
+    head, tail = os.path.split(file_path)
+    return os.path.join(head, _INDEX_DIR, tail + '.idx')
+
+
+def _read_index_header(index_path: str, st: os.stat_result) -> Optional[Tuple[int, bool]]:
+    """(line count, nested syntax flag) of a sidecar index built for this exact (mtime, size), else None."""
+    try:
+        with open(index_path, 'rb') as file:
+            header = file.read(_INDEX_HEADER.size)
+            index_size = os.fstat(file.fileno()).st_size
+    except OSError:
+        return None
+    if len(header) != _INDEX_HEADER.size:
+        return None
+    magic, version, mtime_ns, size, count, nested = _INDEX_HEADER.unpack(header)
+    if (magic, version, mtime_ns, size) != (_INDEX_MAGIC, _INDEX_VERSION, st.st_mtime_ns, st.st_size):
+        return None
+    if index_size != _INDEX_HEADER.size + count * _OFFSET.size:
+        return None
+    return count, nested
+
+
+def _write_index(file_path: str, index_path: str, st: os.stat_result) -> Tuple[int, bool]:
+    """Stream the line offsets of `file_path` into a new sidecar index; returns (line count, nested syntax flag)."""
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f'{index_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, st.st_mtime_ns, st.st_size, 0, False))
+            count = 0
+            nested = False
+            for offset, line in _iter_line_offsets(file_path):
+                out.write(_OFFSET.pack(offset))
+                count += 1
+                nested = nested or _has_nested_syntax(line)
+            out.seek(0)
+            out.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, st.st_mtime_ns, st.st_size, count, nested))
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return count, nested
+
+
+class IndexedLines(SequenceABC):
+    """
+    The cleaned lines of a large wildcard file, read from disk on demand.
+
+    Indexing costs one seek into the sidecar index and one into the file, so memory and
+    latency do not grow with the file. Iterating streams the file once.
+    """
+    __slots__ = ('path', 'index_path', '_count', 'has_nested_syntax')
+
+    def __init__(self, path: str, index_path: str, count: int, has_nested_syntax: bool):
+        self.path = path
+        self.index_path = index_path
+        self._count = count
+        self.has_nested_syntax = has_nested_syntax
+
+    @classmethod
+    def open(cls, file_path: str, st: os.stat_result) -> Optional['IndexedLines']:
+        """Use the sidecar index for `file_path`, (re)building it if it is stale.
+
+        Returns None if no index can be written, e.g. on a read-only wildcard directory.
+        """
+        index_path = _index_path(file_path)
+        header = _read_index_header(index_path, st)
+        if header is None:
+            try:
+                header = _write_index(file_path, index_path, st)
+            except OSError as e:
+                print(f'[wildcards] could not index {file_path}: {e}')
+                return None
+        return cls(file_path, index_path, *header)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('wildcard line index out of range')
+        with open(self.index_path, 'rb') as index:
+            index.seek(_INDEX_HEADER.size + i * _OFFSET.size)
+            (offset,) = _OFFSET.unpack(index.read(_OFFSET.size))
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            for _pos, raw in _iter_raw_lines(file, 4096):
+                return raw.decode('utf-8').strip()
+            return ''
+
+    def __iter__(self) -> Iterator[str]:
+        for _offset, line in _iter_line_offsets(self.path):
+            yield line
+
+
+class WildcardFile:
+    """Parsed contents of a single wildcard file, tagged with the stat it was read under."""
+    __slots__ = ('path', 'mtime_ns', 'size', 'lines', 'has_nested_syntax', '_word_index', '_unindexed', '_filtered')
+
+    def __init__(self, path: str, mtime_ns: int, size: int, lines: Sequence[str]):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.lines = lines
+        # Whether any line needs parsing to expand; large files take it from their sidecar index
+        if isinstance(lines, IndexedLines):
+            self.has_nested_syntax = lines.has_nested_syntax
+        else:
+            self.has_nested_syntax = any(_has_nested_syntax(line) for line in lines)
+        self._word_index: Optional[Dict[str, List[int]]] = None
+        self._unindexed: List[int] = []
+        self._filtered: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+
+    def _build_word_index(self) -> Dict[str, List[int]]:
+        """Map each lower-cased token to the ids of the ASCII lines containing it.
+
+        Lines with non-ASCII characters are kept aside and always checked with the regex,
+        since Unicode case folding can match characters that str.lower() does not relate.
+        """
+        index: Dict[str, List[int]] = {}
+        unindexed: List[int] = []
+        for line_id, line in enumerate(self.lines):
+            if not line.isascii():
+                unindexed.append(line_id)
+                continue
+            for token in set(_TOKEN_RE.findall(line.lower())):
+                index.setdefault(token, []).append(line_id)
+        self._unindexed = unindexed
+        self._word_index = index
+        return index
+
+    def matching_line_ids(self, words: Sequence[str]) -> Tuple[int, ...]:
+        """Sorted ids of lines containing any of `words` as a whole word (case-insensitive)."""
+        key = tuple(words)
+        cached = self._filtered.get(key)
+        if cached is not None:
+            return cached
+
+        patterns = [re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE) for word in key]
+        # Large files are scanned line by line rather than indexed, to keep memory flat
+        if not isinstance(self.lines, IndexedLines) and all(_ASCII_WORD_RE.match(word) for word in key):
+            index = self._word_index if self._word_index is not None else self._build_word_index()
+            ids = set()
+            for word in key:
+                ids.update(index.get(word.lower(), ()))
+            ids.update(i for i in self._unindexed if any(p.search(self.lines[i]) for p in patterns))
+            result = tuple(sorted(ids))
+        else:
+            result = tuple(i for i, line in enumerate(self.lines) if any(p.search(line) for p in patterns))
+
+        if len(self._filtered) >= _FILTER_CACHE_LIMIT:
+            self._filtered.clear()
+        self._filtered[key] = result
+        return result
+
+    def next_matching_line(self, start_idx: int, words: Sequence[str]) -> Optional[int]:
+        """First line id at or after `start_idx` (wrapping around) matching any of `words`."""
+        ids = self.matching_line_ids(words)
+        if not ids:
+            return None
+        pos = bisect_left(ids, start_idx)
+        return ids[pos] if pos < len(ids) else ids[0]
+
+
+class WildcardStore:
+    """
+    Process-wide cache of parsed wildcard files.
+
+    Each file is read and cleaned once; later lookups only cost an ``os.stat``
+    and are revalidated against (mtime, size), so edits on disk are picked up
+    on the next lookup without rereading files that have not changed. Files of
+    LARGE_FILE_BYTES or more are served from a sidecar line index instead.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, WildcardFile] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def get(self, file_path: str) -> Optional[WildcardFile]:
+        """Return the parsed file, or None if it does not exist (or is not a regular file)."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None
+        entry, loaded = self.refresh(file_path, st)
+        if entry is not None:
+            with self._lock:
+                if loaded:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return entry
+
+    def refresh(self, file_path: str, st: Optional[os.stat_result]) -> Tuple[Optional[WildcardFile], bool]:
+        """
+        Like get(), for a stat the caller already has (None if the file is gone), and
+        without counting towards hits/misses. Also returns whether the file was (re)read.
+        """
+        key = self._key(file_path)
+        if st is None or not stat.S_ISREG(st.st_mode):
+            with self._lock:
+                self._files.pop(key, None)
+            return None, False
+
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                return entry, False
+
+        lines = IndexedLines.open(file_path, st) if st.st_size >= LARGE_FILE_BYTES else None
+        if lines is None:
+            lines = read_wildcard_lines(file_path)
+        entry = WildcardFile(key, st.st_mtime_ns, st.st_size, lines)
+        with self._lock:
+            self._files[key] = entry
+        return entry, True
+
+    def get_lines(self, file_path: str) -> Optional[Sequence[str]]:
+        """Return the cleaned (non-blank, non-comment, stripped) lines of a wildcard file."""
+        entry = self.get(file_path)
+        return entry.lines if entry is not None else None
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """Drop one file from the cache, or every file when no path is given."""
+        with self._lock:
+            if file_path is None:
+                self._files.clear()
+            else:
+                self._files.pop(self._key(file_path), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._files),
+                "lines": sum(len(e.lines) for e in self._files.values()),
+                "indexed_files": sum(1 for e in self._files.values() if isinstance(e.lines, IndexedLines)),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class WildcardPreloader:
+    """
+    Background thread that keeps a WildcardStore loaded with every wildcard file under a
+    directory, so prompts do not wait on reading or re-reading them.
+
+    The directory tree is walked with os.scandir once at start and then every `interval`
+    seconds; files whose (mtime, size) changed are re-read right away and deleted files
+    are dropped. Directories starting with '.' (such as the sidecar .index) are skipped.
+    """
+
+    def __init__(self, store: WildcardStore):
+        self.store = store
+        self._root = None
+        self.interval = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._known: set = set()
+        self.files = 0
+        self.bytes = 0
+        self.refreshed = 0
+        self.scans = 0
+        self.last_refresh: Optional[float] = None
+        self.last_scan_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, root, interval: float) -> None:
+        """Start polling `root` (a path, or a callable returning one) every `interval` seconds."""
+        if self.running:
+            return
+        self._root = root
+        self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ovum-wildcard-preloader', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:  # keep polling; the next scan may well succeed
+                self.last_error = f'{type(e).__name__}: {e}'
+                print(f'[wildcards] preload scan failed: {self.last_error}')
+            self._stop.wait(self.interval)
+
+    def _walk(self, directory: str):
+        """Yield (path, stat) for every .txt file under `directory`."""
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if not entry.name.startswith('.'):
+                        yield from self._walk(entry.path)
+                elif entry.name.endswith('.txt'):
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+    def scan(self) -> int:
+        """Walk the directory once, loading new and changed files; returns how many were read."""
+        root = self._root() if callable(self._root) else self._root
+        start = time.perf_counter()
+        known = set()
+        files = 0
+        total_bytes = 0
+        refreshed = 0
+        for path, st in self._walk(root):
+            try:
+                entry, loaded = self.store.refresh(path, st)
+            except (OSError, UnicodeDecodeError) as e:
+                self.last_error = f'{path}: {e}'
+                continue
+            if entry is None:
+                continue
+            known.add(entry.path)
+            files += 1
+            total_bytes += st.st_size
+            refreshed += loaded
+        for gone in self._known - known:
+            self.store.invalidate(gone)
+        self._known = known
+        self.files = files
+        self.bytes = total_bytes
+        self.refreshed = refreshed
+        self.scans += 1
+        self.last_scan_seconds = time.perf_counter() - start
+        self.last_refresh = time.time()
+        return refreshed
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "files": self.files,
+            "bytes": self.bytes,
+            "scans": self.scans,
+            "refreshed_last_scan": self.refreshed,
+            "last_refresh": self.last_refresh,
+            "last_scan_seconds": self.last_scan_seconds,
+            "last_error": self.last_error,
+            "store": self.store.stats(),
+        }
+
+
+WILDCARD_STORE = WildcardStore()
+WILDCARD_PRELOADER = WildcardPreloader(WILDCARD_STORE)